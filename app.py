@@ -1,637 +1,700 @@
 import os
-import pandas as pd
-from flask import Flask, request, jsonify, render_template_string
+import hmac
+import json
+import threading
+import time
+import import_timer
+
+# Everything imported here is on the path to the first prediction; pandas and sklearn are
+# deliberately not (see predictor.py and model_bundle.py)
+import_timer.start()
+import numpy as np
+from flask import Flask, Response, request, jsonify, g
+import metrics
 from flask_cors import CORS
-from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
-from sklearn.preprocessing import LabelEncoder
+from model_bundle import BASE_DIR, FEATURE_COLUMNS, DEFAULT_MODEL_PATH, save_bundle, load_bundle
+from memory_report import process_memory
+from prediction_cache import make_cache
+from predictor import Predictor, NUMERIC_RANGES
+import sweep
+import wire_format
+from micro_batcher import MicroBatcher
+from prediction_log import PredictionLog
+from static_page import StaticPage, StaticPageMiddleware
+IMPORT_SECONDS = import_timer.stop()
 
 app = Flask(__name__)
 CORS(app)
 
 # Global variables
-score_model = None
-passfail_model = None
-encoders = {}
-data_loaded = False
+# The loaded model is one immutable Predictor. Reloads build a new one and swap this
+# reference; each request reads it once, so it never mixes two model versions.
+predictor = None
+
+# Upper bound on rows accepted by /predict/batch in a single request
+MAX_BATCH_ROWS = int(os.environ.get("MAX_BATCH_ROWS", 100000))
+# Central share of the per-tree scores reported as score_interval by ?uncertainty=1
+UNCERTAINTY_INTERVAL = float(os.environ.get("UNCERTAINTY_INTERVAL", 0.9))
+
+# Saved bundle written by model_training.py
+MODEL_PATH = os.environ.get("MODEL_PATH", DEFAULT_MODEL_PATH)
+# Set TRAIN_ON_STARTUP=1 to fit from the CSV when no bundle can be loaded
+TRAIN_ON_STARTUP = os.environ.get("TRAIN_ON_STARTUP", "0") == "1"
+# Training here reads the CSV through a columnar cache (feature_store.py, FEATURE_CACHE_DIR)
+# so retraining on an unchanged file skips parsing; FEATURE_CACHE=off disables it
+FEATURE_CACHE = os.environ.get("FEATURE_CACHE", "on")
+# Unpickle the sklearn forests (and import sklearn) only when the sklearn backend first
+# needs them. gunicorn.conf.py defaults this to 0 so preload unpickles them once in the
+# master and the workers share them; unpickled lazily, each worker gets a private copy.
+# Only the startup load can be shared that way, so reloaded bundles are always lazy.
+LAZY_SKLEARN = os.environ.get("LAZY_SKLEARN", "1") == "1"
+# Memory-map the bundle's arrays read-only ("r"); set MODEL_MMAP=off to load private copies
+MODEL_MMAP = os.environ.get("MODEL_MMAP", "r")
+# auto | flat | sklearn | table, see predictor.py
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "auto")
+FLAT_MAX_ROWS = int(os.environ.get("FLAT_MAX_ROWS", 256))
+# Match categorical inputs ignoring case and surrounding whitespace ("  male" -> "Male");
+# set NORMALIZE_LABELS=0 to require the exact training labels
+NORMALIZE_LABELS = os.environ.get("NORMALIZE_LABELS", "1") == "1"
+# Cache of /predict results keyed on the encoded features: "memory" (per worker),
+# "disk" (SQLite file shared by all workers) or "off"
+PREDICTION_CACHE = os.environ.get("PREDICTION_CACHE", "memory")
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", 10000))
+PREDICTION_CACHE_TTL = float(os.environ.get("PREDICTION_CACHE_TTL", 0))
+PREDICTION_CACHE_PATH = os.environ.get("PREDICTION_CACHE_PATH",
+                                       os.path.join(os.path.dirname(MODEL_PATH), "prediction_cache.sqlite"))
+# Seconds between checks of MODEL_PATH for a new bundle (0 disables the watcher)
+MODEL_WATCH_INTERVAL = float(os.environ.get("MODEL_WATCH_INTERVAL", 10))
+# "microbatch" queues concurrent /predict calls for up to MICROBATCH_WAIT_MS (or until
+# MICROBATCH_MAX_ROWS rows wait) and scores them together; needs a threaded server.
+# "direct" scores each request on its own thread.
+SERVING_MODE = os.environ.get("SERVING_MODE", "direct")
+MICROBATCH_WAIT_MS = float(os.environ.get("MICROBATCH_WAIT_MS", 2))
+MICROBATCH_MAX_ROWS = int(os.environ.get("MICROBATCH_MAX_ROWS", 64))
+# JSONL log of every prediction (inputs, outputs, model version, latency), written by a
+# background thread to <stem>-<pid>.jsonl per process. Rotated by size and age, gzipped
+# unless PREDICTION_LOG_COMPRESS=off. Rows are dropped (and counted) when they would take
+# the rows waiting past PREDICTION_LOG_QUEUE; the default fits one MAX_BATCH_ROWS batch.
+# PREDICTION_LOG=off disables it.
+PREDICTION_LOG = os.environ.get("PREDICTION_LOG", "on")
+PREDICTION_LOG_PATH = os.environ.get("PREDICTION_LOG_PATH",
+                                     os.path.join(BASE_DIR, "logs", "predictions.jsonl"))
+PREDICTION_LOG_MAX_MB = float(os.environ.get("PREDICTION_LOG_MAX_MB", 64))
+PREDICTION_LOG_MAX_AGE = float(os.environ.get("PREDICTION_LOG_MAX_AGE", 3600))
+PREDICTION_LOG_COMPRESS = os.environ.get("PREDICTION_LOG_COMPRESS", "gzip") != "off"
+PREDICTION_LOG_QUEUE = int(os.environ.get("PREDICTION_LOG_QUEUE", 100000))
+# POST /admin/reload is disabled unless this is set, and then requires a matching X-Admin-Token header
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+# The home page is served from memory (gzip/brotli, ETag, Cache-Control). HOME_PAGE=static
+# answers GET / in WSGI middleware before Flask routing; the page is then served even
+# without a model, and those requests do not appear in the request metrics.
+HOME_PAGE = os.environ.get("HOME_PAGE", "flask")
+HOME_PAGE_PATH = os.environ.get("HOME_PAGE_PATH", os.path.join(BASE_DIR, "index.html"))
+HOME_PAGE_MAX_AGE = int(os.environ.get("HOME_PAGE_MAX_AGE", 300))
 
 # -----------------------------------------
-# SMART DATA LOADER
+# MODEL LOADER
 # -----------------------------------------
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-possible_paths = [
-    os.path.join(BASE_DIR, "data", "sample.csv"),
-    os.path.join(BASE_DIR, "sample.csv"),
-    "data/sample.csv",
-    "sample.csv"
-]
-
-csv_path = None
-for path in possible_paths:
-    if os.path.exists(path):
-        csv_path = path
-        break
-
-if csv_path:
+def bundle_stamp(path):
+    # Changes whenever save_bundle replaces the file
     try:
-        df = pd.read_csv(csv_path)
-        
-        # Train Encoders
-        le_gender = LabelEncoder()
-        le_parent_edu = LabelEncoder()
-        le_internet = LabelEncoder()
-        le_extra = LabelEncoder()
-        le_passfail = LabelEncoder()
-
-        df['Gender'] = le_gender.fit_transform(df['Gender'])
-        df['Parental_Education_Level'] = le_parent_edu.fit_transform(df['Parental_Education_Level'])
-        df['Internet_Access_at_Home'] = le_internet.fit_transform(df['Internet_Access_at_Home'])
-        df['Extracurricular_Activities'] = le_extra.fit_transform(df['Extracurricular_Activities'])
-        df['Pass_Fail'] = le_passfail.fit_transform(df['Pass_Fail'])
-
-        encoders = {
-            'Gender': le_gender,
-            'Parental_Education_Level': le_parent_edu,
-            'Internet_Access_at_Home': le_internet,
-            'Extracurricular_Activities': le_extra,
-            'Pass_Fail': le_passfail
-        }
-
-        # Train Models
-        X = df[['Gender','Study_Hours_per_Week','Attendance_Rate','Past_Exam_Scores',
-                'Parental_Education_Level','Internet_Access_at_Home','Extracurricular_Activities']]
-        y_score = df['Final_Exam_Score']
-        y_passfail = df['Pass_Fail']
-
-        score_model = RandomForestRegressor(n_estimators=50, random_state=42)
-        score_model.fit(X, y_score)
+        stat = os.stat(path)
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
 
-        passfail_model = RandomForestClassifier(n_estimators=50, random_state=42)
-        passfail_model.fit(X, y_passfail)
-
-        data_loaded = True
-        print("✅ Models trained successfully!")
-    except Exception as e:
-        print(f"❌ ERROR: {e}")
 
-# -----------------------------------------
-# THE WEBSITE DESIGN (HTML)
-# -----------------------------------------
-html_template = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>EduPredict | Student Performance AI</title>
-    <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;600;700&display=swap" rel="stylesheet">
-    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css">
-
-    <style>
-        :root {
-            --primary-color: #2563eb;
-            --primary-dark: #1e40af;
-            --secondary-color: #1e293b;
-            --accent-color: #3b82f6;
-            --bg-color: #f3f4f6;
-            --card-bg: #ffffff;
-            --text-color: #334155;
-            --border-radius: 12px;
-        }
+def record_training_stages(bundle):
+    for entry in bundle.get("training_stages", []):
+        metrics.observe_training_stage("train_" + entry["stage"], entry["seconds"])
 
-        * {
-            box-sizing: border-box;
-            margin: 0;
-            padding: 0;
-            font-family: 'Inter', sans-serif;
-        }
 
-        body {
-            background: linear-gradient(135deg, #f0f9ff 0%, #e0f2fe 100%);
-            color: var(--text-color);
-            line-height: 1.6;
-            padding-top: 80px; /* Space for fixed navbar */
-        }
+print(f"⏱ Imports took {import_timer.summary(IMPORT_SECONDS)}")
+for package, seconds in IMPORT_SECONDS.items():
+    metrics.observe_training_stage("import_" + package, seconds)
 
-        /* --- Navbar Styling --- */
-        .navbar {
-            background-color: rgba(255, 255, 255, 0.95);
-            backdrop-filter: blur(10px);
-            position: fixed;
-            top: 0;
-            width: 100%;
-            padding: 15px 5%;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.05);
-            z-index: 1000;
-        }
 
-        .logo {
-            font-size: 24px;
-            font-weight: 700;
-            color: var(--primary-color);
-            text-decoration: none;
-            display: flex;
-            align-items: center;
-            gap: 10px;
-        }
+def training_feature_store():
+    if FEATURE_CACHE == "off":
+        return None
+    from feature_store import FeatureStore
+    return FeatureStore()
 
-        .nav-links {
-            display: flex;
-            gap: 30px;
-        }
 
-        .nav-links a {
-            text-decoration: none;
-            color: var(--secondary-color);
-            font-weight: 500;
-            font-size: 16px;
-            transition: color 0.3s;
-        }
+bundle = None
+loaded_stamp = bundle_stamp(MODEL_PATH)
+if os.path.exists(MODEL_PATH):
+    try:
+        with metrics.training_stage("load_bundle"):
+            bundle = load_bundle(MODEL_PATH, mmap_mode=None if MODEL_MMAP == "off" else MODEL_MMAP)
+        print(f"✅ Loaded model bundle {bundle['model_version']} from {MODEL_PATH}")
+    except Exception as e:
+        print(f"❌ ERROR loading {MODEL_PATH}: {e}")
+else:
+    print(f"⚠️ No model bundle at {MODEL_PATH}. Run: python model_training.py")
+
+if bundle is None and TRAIN_ON_STARTUP:
+    from model_training import find_data_path, train_bundle
+    csv_path = find_data_path()
+    if csv_path:
+        try:
+            bundle = train_bundle(csv_path, store=training_feature_store())
+            record_training_stages(bundle)
+            print("✅ Models trained successfully!")
+        except Exception as e:
+            print(f"❌ ERROR: {e}")
+
+if bundle is not None:
+    predictor = Predictor(bundle, INFERENCE_BACKEND, FLAT_MAX_ROWS, NORMALIZE_LABELS, LAZY_SKLEARN)
+
+    if predictor.backend != INFERENCE_BACKEND:
+        print(f"⚠️ INFERENCE_BACKEND={INFERENCE_BACKEND} but the bundle has no lookup table "
+              f"(train with --lookup-table); using {predictor.backend}")
+
+# Keys carry the model version, so entries from a previous model are never served
+prediction_cache = make_cache(PREDICTION_CACHE, PREDICTION_CACHE_SIZE,
+                              PREDICTION_CACHE_TTL, PREDICTION_CACHE_PATH)
+
+micro_batcher = MicroBatcher(MICROBATCH_WAIT_MS, MICROBATCH_MAX_ROWS) if SERVING_MODE == "microbatch" else None
+
+prediction_log = None
+if PREDICTION_LOG != "off":
+    prediction_log = PredictionLog(PREDICTION_LOG_PATH, int(PREDICTION_LOG_MAX_MB * (1 << 20)),
+                                   PREDICTION_LOG_MAX_AGE, PREDICTION_LOG_COMPRESS, PREDICTION_LOG_QUEUE)
 
-        .nav-links a:hover {
-            color: var(--primary-color);
-        }
+# -----------------------------------------
+# HOT RELOAD
+# -----------------------------------------
+reload_lock = threading.Lock()
+reload_status = {"state": "idle", "error": None}
+watcher_pid = None
+
+
+def reload_model(train=False):
+    # Loads (or trains and saves) a new bundle, then swaps it in. In-flight requests keep
+    # the Predictor they started with; new requests see the new one.
+    global predictor, loaded_stamp
+    with reload_lock:
+        reload_status.update(state="training" if train else "loading", error=None)
+        try:
+            if train:
+                from model_training import find_data_path, train_bundle
+                csv_path = find_data_path()
+                if not csv_path:
+                    raise FileNotFoundError("no training data found")
+                new_bundle = train_bundle(csv_path, store=training_feature_store())
+                record_training_stages(new_bundle)
+                save_bundle(new_bundle, MODEL_PATH)
+            stamp = bundle_stamp(MODEL_PATH)
+            with metrics.training_stage("load_bundle"):
+                new_bundle = load_bundle(MODEL_PATH, mmap_mode=None if MODEL_MMAP == "off" else MODEL_MMAP)
+            # Always lazy here: a reload runs in every worker after the fork, so unpickling
+            # eagerly would give each worker its own copy of the forests at once
+            new_predictor = Predictor(new_bundle, INFERENCE_BACKEND, FLAT_MAX_ROWS, NORMALIZE_LABELS, lazy_sklearn=True)
+        except Exception as e:
+            reload_status.update(state="failed", error=str(e))
+            metrics.count_error("reload", type(e).__name__)
+            print(f"❌ ERROR reloading model: {e}")
+            return None
+
+        predictor, loaded_stamp = new_predictor, stamp
+        if PREDICTION_CACHE == "memory":
+            prediction_cache.clear()
+        reload_status.update(state="idle")
+        print(f"✅ Swapped in model bundle {new_predictor.model_version}")
+        return new_predictor
+
+
+def watch_model_file():
+    while True:
+        time.sleep(MODEL_WATCH_INTERVAL)
+        stamp = bundle_stamp(MODEL_PATH)
+        if stamp is not None and stamp != loaded_stamp and not reload_lock.locked():
+            reload_model()
+
+
+@app.before_request
+def label_request_stages():
+    metrics.set_endpoint(request.endpoint or "unknown")
+
+
+@app.before_request
+def start_model_watcher():
+    # Started lazily in each serving process: threads started in the gunicorn master
+    # before the fork do not exist in the workers
+    global watcher_pid
+    if MODEL_WATCH_INTERVAL > 0 and watcher_pid != os.getpid():
+        watcher_pid = os.getpid()
+        threading.Thread(target=watch_model_file, name="model-watcher", daemon=True).start()
+
+
+@app.after_request
+def add_model_version(response):
+    version = g.get("model_version")
+    if version:
+        response.headers["X-Model-Version"] = version
+    metrics.count_request(request.endpoint or "unknown", response.status_code)
+    return response
+
+
+def current_predictor():
+    # Snapshot the model for the rest of the request and tag the response with its version
+    current = predictor
+    if current is not None:
+        g.model_version = current.model_version
+    return current
 
-        /* --- Main Layout --- */
-        .main-container {
-            max-width: 1100px;
-            margin: 40px auto;
-            padding: 0 20px;
-        }
+# -----------------------------------------
+# BATCH ENCODING
+# -----------------------------------------
+def parse_batch_body():
+    # Accepts a JSON array, or NDJSON (one student object per line).
+    # Returns the parsed rows plus per-row error results for lines that were not valid JSON.
+    raw = request.get_data(cache=False)
+    if request.mimetype in ("application/x-ndjson", "application/jsonlines", "application/jsonl"):
+        rows, errors = [], []
+        for line in raw.splitlines():
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+                errors.append(None)
+            except ValueError as e:
+                rows.append(None)
+                errors.append({"error": f"Invalid JSON: {e}"})
+        return rows, errors
+
+    rows = json.loads(raw)
+    if not isinstance(rows, list):
+        raise ValueError("Expected a JSON array of students")
+    return rows, [None] * len(rows)
+
+
+def encode_batch(model, rows, errors):
+    # Returns the float64 feature matrix for the valid rows and their positions in the input;
+    # rows that fail validation get the same error body as /predict written into `errors`.
+    import pandas as pd
+    records = [row if isinstance(row, dict) else {} for row in rows]
+    # object dtype keeps each value as sent (integers beyond float range included) for the
+    # re-check of flagged rows against the original records
+    frame = pd.DataFrame(records, columns=FEATURE_COLUMNS, dtype=object)
+    X, problems = model.encode_frame(frame, records)
+
+    for i, row in enumerate(rows):
+        if errors[i] is not None:
+            continue
+        if not isinstance(row, dict):
+            errors[i] = {"error": "Invalid input", "details": model.feature_encoder.encode_row(row)[1]}
+        elif problems[i]:
+            errors[i] = {"error": "Invalid input", "details": problems[i]}
+
+    valid_idx = np.flatnonzero([err is None for err in errors])
+    return X[valid_idx], valid_idx
 
-        /* --- Predictor Card --- */
-        .card {
-            background: var(--card-bg);
-            border-radius: var(--border-radius);
-            padding: 40px;
-            box-shadow: 0 10px 25px rgba(0,0,0,0.05);
-            border: 1px solid rgba(0,0,0,0.05);
-            margin-bottom: 60px;
-        }
 
-        .section-title {
-            text-align: center;
-            margin-bottom: 10px;
-            font-size: 28px;
-            color: var(--secondary-color);
-        }
+# -----------------------------------------
+# BINARY ROWS (wire_format.py)
+# -----------------------------------------
+# Binary rows are validated while decoding, which only reports whether a row is valid
+BINARY_ROW_PROBLEMS = [{"field": None, "error": "unknown category index or value out of range"}]
 
-        .section-subtitle {
-            text-align: center;
-            color: #64748b;
-            margin-bottom: 30px;
-            font-size: 16px;
-        }
 
-        /* --- Form Grid --- */
-        .form-grid {
-            display: grid;
-            grid-template-columns: 1fr 1fr;
-            gap: 25px;
-        }
+def is_binary_request():
+    return request.mimetype == wire_format.CONTENT_TYPE
 
-        .form-group {
-            display: flex;
-            flex-direction: column;
-        }
 
-        label {
-            font-weight: 600;
-            margin-bottom: 8px;
-            font-size: 14px;
-            color: var(--secondary-color);
-        }
+def wants_binary():
+    # Response format for /predict and /predict/batch, whatever the request body was:
+    # JSON unless the client asks for the binary layout; browsers send */*, which stays JSON
+    best = request.accept_mimetypes.best_match(["application/json", wire_format.CONTENT_TYPE])
+    return best == wire_format.CONTENT_TYPE
 
-        input, select {
-            padding: 12px 15px;
-            border: 1px solid #cbd5e1;
-            border-radius: 8px;
-            font-size: 15px;
-            transition: all 0.3s;
-            background-color: #f8fafc;
-        }
 
-        input:focus, select:focus {
-            outline: none;
-            border-color: var(--primary-color);
-            box-shadow: 0 0 0 3px rgba(37, 99, 235, 0.1);
-            background-color: #fff;
-        }
+def wants_uncertainty():
+    return request.args.get("uncertainty") == "1"
 
-        /* Full width for button */
-        .btn-container {
-            grid-column: span 2;
-            margin-top: 20px;
-        }
 
-        button {
-            width: 100%;
-            padding: 16px;
-            border: none;
-            border-radius: 8px;
-            background: linear-gradient(135deg, var(--primary-color), var(--accent-color));
-            color: white;
-            font-size: 18px;
-            font-weight: 600;
-            cursor: pointer;
-            transition: transform 0.2s, box-shadow 0.2s;
-            box-shadow: 0 4px 15px rgba(37, 99, 235, 0.3);
-        }
+def uncertainty_fields(model, details):
+    # One dict per row of Predictor.predict_uncertainty's details
+    labels = model.passfail_classes.tolist()
+    pass_column = labels.index("Pass") if "Pass" in labels else None
+    rows = []
+    for std, low, high, proba in zip(details["score_std"].tolist(), details["score_low"].tolist(),
+                                     details["score_high"].tolist(), details["proba"].tolist()):
+        fields = {"score_std": round(std, 2), "score_interval": [round(low, 2), round(high, 2)],
+                  "probabilities": {label: round(p, 4) for label, p in zip(labels, proba)}}
+        if pass_column is not None:
+            fields["pass_probability"] = round(proba[pass_column], 4)
+        rows.append(fields)
+    return rows
 
-        button:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 6px 20px rgba(37, 99, 235, 0.4);
-        }
 
-        button:active {
-            transform: translateY(0);
-        }
+def wants_explanation():
+    return request.args.get("explain") == "1"
 
-        /* --- Result Box --- */
-        .result-box {
-            grid-column: span 2;
-            margin-top: 25px;
-            background: #eff6ff;
-            border-left: 5px solid var(--primary-color);
-            padding: 20px;
-            border-radius: 8px;
-            display: none; /* Hidden by default */
-            animation: fadeIn 0.5s ease;
-        }
 
-        .result-header {
-            font-size: 18px;
-            font-weight: 700;
-            color: var(--primary-dark);
-            margin-bottom: 10px;
-            display: flex;
-            align-items: center;
-            gap: 10px;
-        }
+def contribution_fields(model, explanation):
+    # One dict per row of Predictor.explain: bias plus one contribution per feature, summing
+    # to the flat forests' score and probability of model.explained_class
+    score_bias, pass_bias = round(explanation["score_bias"], 4), round(explanation["pass_bias"], 4)
+    return [{"Final_Exam_Score": {"bias": score_bias, "features": dict(zip(FEATURE_COLUMNS, score))},
+             "Pass_Fail": {"class": model.explained_class, "bias": pass_bias,
+                           "features": dict(zip(FEATURE_COLUMNS, passing))}}
+            for score, passing in zip(explanation["score"].round(4).tolist(), explanation["pass"].round(4).tolist())]
 
-        .result-item {
-            font-size: 16px;
-            margin: 5px 0;
-            display: flex;
-            justify-content: space-between;
-            border-bottom: 1px dashed #bfdbfe;
-            padding-bottom: 5px;
-        }
-        
-        .result-item span {
-            font-weight: 600;
-            color: #333;
-        }
 
-        @keyframes fadeIn {
-            from { opacity: 0; transform: translateY(10px); }
-            to { opacity: 1; transform: translateY(0); }
-        }
+def json_only_options():
+    return jsonify({"error": "?uncertainty=1 and ?explain=1 are only available with JSON responses"}), 406
 
-        /* --- Algorithms Section --- */
-        .algo-section {
-            padding: 40px 0;
-        }
 
-        .algo-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(280px, 1fr));
-            gap: 30px;
-            margin-top: 30px;
-            /* Ensure grid items align to top so they don't stretch awkwardly if content differs */
-            align-items: start; 
-        }
+def schema_mismatch(model):
+    return jsonify({"error": "Missing or stale X-Schema-Id; fetch GET /predict/schema",
+                    "schema_id": model.schema_id}), 409
 
-        /* NEW CSS: Target the 4th card (Decision Tree) to center it */
-        .algo-grid > .algo-card:nth-child(4) {
-            grid-column: 1 / -1; /* Span full width of the grid */
-            justify-self: center; /* Center horizontally */
-            width: 100%; 
-            max-width: 400px; /* Restrict width so it doesn't look ridiculously wide */
-        }
 
-        .algo-card {
-            background: white;
-            padding: 30px;
-            border-radius: var(--border-radius);
-            box-shadow: 0 4px 15px rgba(0, 0, 0, 0.05);
-            transition: transform 0.3s;
-            border-top: 4px solid var(--primary-color);
-            display: flex;
-            flex-direction: column;
-            gap: 15px;
-            height: 100%; /* Makes cards in the same row same height */
-        }
+def binary_response(model, scores, passfail_idx, valid):
+    with metrics.stage("serialize"):
+        body = wire_format.encode_results(scores, passfail_idx, valid)
+    return Response(body, mimetype=wire_format.CONTENT_TYPE, headers={"X-Schema-Id": model.schema_id})
 
-        .algo-card:hover {
-            transform: translateY(-5px);
-            box-shadow: 0 10px 25px rgba(0, 0, 0, 0.1);
-        }
 
-        .algo-icon {
-            font-size: 32px;
-            color: var(--primary-color);
-            margin-bottom: 5px;
-        }
+# -----------------------------------------
+# PREDICTION LOG (prediction_log.py)
+# -----------------------------------------
+def log_prediction(model, inputs, score, label, started, cached):
+    if prediction_log is not None:
+        prediction_log.log({
+            "ts": time.time(), "endpoint": "predict", "model_version": model.model_version,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 3), "cached": cached,
+            "inputs": inputs, "Final_Exam_Score": round(score, 2), "Pass_Fail": label,
+        })
 
-        .algo-card h3 {
-            color: var(--secondary-color);
-            font-size: 20px;
-        }
 
-        .algo-card p {
-            font-size: 14px;
-            color: #64748b;
-            line-height: 1.7;
-        }
+def log_batch(model, get_inputs, valid_idx, scores, passfail_idx, started):
+    # One line per scored row. The lines are built lazily on the log's writer thread;
+    # get_inputs(i) returns the inputs of row i.
+    if prediction_log is None:
+        return
+    ts, latency_ms = time.time(), round((time.perf_counter() - started) * 1000, 3)
 
-        .badge {
-            display: inline-block;
-            padding: 4px 12px;
-            border-radius: 20px;
-            font-size: 12px;
-            font-weight: 600;
-            background: #e0f2fe;
-            color: var(--primary-dark);
-            width: fit-content;
-        }
+    def records():
+        labels = model.passfail_classes.take(np.asarray(passfail_idx, dtype=np.intp))
+        for i, score, label in zip(valid_idx.tolist(), scores.tolist(), labels.tolist()):
+            yield {"ts": ts, "endpoint": "predict_batch", "model_version": model.model_version,
+                   "latency_ms": latency_ms, "inputs": get_inputs(i),
+                   "Final_Exam_Score": round(score, 2), "Pass_Fail": label}
 
-        /* Mobile Responsive */
-        @media (max-width: 900px) {
-            .form-grid {
-                grid-template-columns: 1fr;
-            }
-            .btn-container, .result-box {
-                grid-column: span 1;
-            }
-            .nav-links {
-                display: none;
-            }
-            /* Reset the centered behavior on smaller screens so it flows normally */
-            .algo-grid > .algo-card:nth-child(4) {
-                grid-column: auto;
-                justify-self: stretch;
-                max-width: none;
-            }
-        }
-    </style>
-</head>
-<body>
-
-    <nav class="navbar">
-        <a href="#" class="logo">
-            <i class="fas fa-graduation-cap"></i> EduPredict
-        </a>
-        <div class="nav-links">
-            <a href="#predictor">Predictor</a>
-            <a href="#algorithms">Model Details</a>
-            <a href="#">About</a>
-        </div>
-    </nav>
-
-    <div class="main-container">
-
-        <div class="card" id="predictor">
-            <h2 class="section-title">Performance Predictor</h2>
-            <p class="section-subtitle">Enter student details below to generate an AI-based performance forecast.</p>
-
-            <div class="form-grid">
-                <div class="form-group">
-                    <label><i class="fas fa-id-badge"></i> Student ID</label>
-                    <input type="number" id="student_id" placeholder="e.g. 1024">
-                </div>
-
-                <div class="form-group">
-                    <label><i class="fas fa-venus-mars"></i> Gender</label>
-                    <select id="gender">
-                        <option value="Male">Male</option>
-                        <option value="Female">Female</option>
-                    </select>
-                </div>
-
-                <div class="form-group">
-                    <label><i class="fas fa-clock"></i> Study Hours per Week</label>
-                    <input type="number" id="study_hours" placeholder="e.g. 15">
-                </div>
-
-                <div class="form-group">
-                    <label><i class="fas fa-calendar-check"></i> Attendance Rate (%)</label>
-                    <input type="number" id="attendance_rate" placeholder="e.g. 85">
-                </div>
-
-                <div class="form-group">
-                    <label><i class="fas fa-chart-line"></i> Past Exam Scores (Avg)</label>
-                    <input type="number" id="past_exam_scores" placeholder="e.g. 78">
-                </div>
-
-                <div class="form-group">
-                    <label><i class="fas fa-user-graduate"></i> Parental Education</label>
-                    <select id="parent_edu">
-                        <option value="High School">High School</option>
-                        <option value="College">College</option>
-                        <option value="Graduate">Graduate</option>
-                    </select>
-                </div>
-
-                <div class="form-group">
-                    <label><i class="fas fa-wifi"></i> Internet Access</label>
-                    <select id="internet">
-                        <option value="Yes">Yes</option>
-                        <option value="No">No</option>
-                    </select>
-                </div>
-
-                <div class="form-group">
-                    <label><i class="fas fa-futbol"></i> Extracurriculars</label>
-                    <select id="extra">
-                        <option value="Yes">Yes</option>
-                        <option value="No">No</option>
-                    </select>
-                </div>
-
-                <div class="btn-container">
-                    <button onclick="predict()">
-                        <i class="fas fa-magic"></i> Predict Result
-                    </button>
-                </div>
-
-                <div class="result-box" id="resultBox">
-                    <div class="result-header">
-                        <i class="fas fa-clipboard-check"></i> Prediction Complete
-                    </div>
-                    <div class="result-item">
-                        Predicted Score: <span id="scoreResult">--</span>
-                    </div>
-                    <div class="result-item" style="border: none;">
-                        Final Outcome: <span id="passFailResult">--</span>
-                    </div>
-                </div>
-
-            </div>
-        </div>
-
-        <div class="algo-section" id="algorithms">
-            <h2 class="section-title">Machine Learning Algorithms</h2>
-            <p class="section-subtitle">We evaluated multiple regression models to ensure the highest accuracy for score prediction.</p>
-            
-            <div class="algo-grid">
-                
-                <div class="algo-card">
-                    <div class="algo-icon"><i class="fas fa-tree"></i></div>
-                    <div class="badge">Recommended</div>
-                    <h3>Random Forest Regressor</h3>
-                    <p>
-                        <strong>How it works:</strong> Constructs hundreds of "Decision Trees" during training and averages their outputs.
-                    </p>
-                    <p>
-                        <strong>Why we use it:</strong> It provides the highest accuracy by reducing overfitting. It handles mixed data exceptionally well.
-                    </p>
-                </div>
-
-                <div class="algo-card">
-                    <div class="algo-icon"><i class="fas fa-chart-line"></i></div>
-                    <div class="badge">Baseline</div>
-                    <h3>Linear Regression</h3>
-                    <p>
-                        <strong>How it works:</strong> Fits a straight line through the data points to establish a direct relationship between input variables and the Target score.
-                    </p>
-                    <p>
-                        <strong>Use Case:</strong> Great for understanding simple correlations, such as "1 extra hour of study adds 2 points to the score."
-                    </p>
-                </div>
-
-                <div class="algo-card">
-                    <div class="algo-icon"><i class="fas fa-rocket"></i></div>
-                    <div class="badge">Advanced</div>
-                    <h3>Gradient Boosting (XGBoost)</h3>
-                    <p>
-                        <strong>How it works:</strong> Builds trees sequentially, where each new tree specifically tries to correct the errors made by the previous ones.
-                    </p>
-                    <p>
-                        <strong>Use Case:</strong> Often wins data science competitions due to high precision, though it requires more tuning than Random Forest.
-                    </p>
-                </div>
-
-                <div class="algo-card">
-                    <div class="algo-icon"><i class="fas fa-sitemap"></i></div>
-                    <div class="badge">Simple alternative</div>
-                    <h3>Decision Tree Regressor</h3>
-                    <p>
-                        <strong>How it works:</strong> Splits data into branches like a flowchart based on conditions (e.g., "Is Attendance > 80%?").
-                    </p>
-                    <p>
-                        <strong>Use Case:</strong> Very easy to visualize and explain, but can be unstable on its own compared to the Random Forest ensemble.
-                    </p>
-                </div>
-
-            </div>
-        </div>
-
-    </div>
-
-    <script>
-        function predict() {
-            // Show loading state on button
-            const btn = document.querySelector("button");
-            const originalText = btn.innerHTML;
-            btn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Processing...';
-            btn.disabled = true;
-
-            const payload = {
-                Student_ID: document.getElementById("student_id").value,
-                Gender: document.getElementById("gender").value,
-                Study_Hours_per_Week: document.getElementById("study_hours").value,
-                Attendance_Rate: document.getElementById("attendance_rate").value,
-                Past_Exam_Scores: document.getElementById("past_exam_scores").value,
-                Parental_Education_Level: document.getElementById("parent_edu").value,
-                Internet_Access_at_Home: document.getElementById("internet").value,
-                Extracurricular_Activities: document.getElementById("extra").value
-            };
-
-            // Call ML API
-            fetch("https://edu-predictor-ml-project.onrender.com/", {
-                method: "POST",
-                headers: { "Content-Type": "application/json" },
-                body: JSON.stringify(payload)
-            })
-            .then(res => res.json())
-            .then(data => {
-                document.getElementById("scoreResult").innerText = data.Final_Exam_Score;
-                
-                // Color code the pass/fail result
-                const statusSpan = document.getElementById("passFailResult");
-                statusSpan.innerText = data.Pass_Fail;
-                statusSpan.style.color = (data.Pass_Fail === "Pass") ? "#16a34a" : "#dc2626"; // Green or Red
-
-                document.getElementById("resultBox").style.display = "block";
-                
-                // Reset button
-                btn.innerHTML = originalText;
-                btn.disabled = false;
-            })
-            .catch(err => {
-                alert("Error connecting to server. Please ensure the backend is running.");
-                console.error(err);
-                btn.innerHTML = originalText;
-                btn.disabled = false;
-            });
-        }
-    </script>
+    prediction_log.log_many(records(), len(valid_idx))
 
-</body>
-</html>
-"""
+# -----------------------------------------
+# HOME PAGE
+# -----------------------------------------
+# index.html has no template variables, so it is read once here instead of being rendered
+# per request; see static_page.py
+home_page = StaticPage.from_file(HOME_PAGE_PATH, max_age=HOME_PAGE_MAX_AGE)
+if HOME_PAGE == "static":
+    app.wsgi_app = StaticPageMiddleware(app.wsgi_app, {"/": home_page})
 
 # -----------------------------------------
 # ROUTES
 # -----------------------------------------
 @app.route("/")
 def home():
-    if data_loaded:
-        return render_template_string(html_template)
+    if predictor is not None:
+        status, headers, body = home_page.respond(request.environ)
+        return Response(body, status, headers)
     else:
-        return "⚠️ App is running, but DATA FILE WAS NOT FOUND. Check your logs!"
+        return "⚠️ App is running, but NO MODEL WAS LOADED. Check your logs!"
 
 @app.route("/predict", methods=["POST"])
 def predict():
-    if not data_loaded:
+    started = time.perf_counter()
+    model = current_predictor()
+    if model is None:
         return jsonify({"error": "Model not loaded"}), 500
 
-    try:
-        data = request.get_json()
-        
-        # Helper to encode inputs safely
-        def safe_encode(key, value):
-            try:
-                return encoders[key].transform([value])[0]
-            except:
-                # Fallback if value (like 'Male') isn't found exactly, try lowercase/trim
-                # This is a basic fallback, strict matching is better for production
-                return encoders[key].transform([encoders[key].classes_[0]])[0] 
-
-        features = [[
-            safe_encode('Gender', data['Gender']),
-            float(data['Study_Hours_per_Week']),
-            float(data['Attendance_Rate']),
-            float(data['Past_Exam_Scores']),
-            safe_encode('Parental_Education_Level', data['Parental_Education_Level']),
-            safe_encode('Internet_Access_at_Home', data['Internet_Access_at_Home']),
-            safe_encode('Extracurricular_Activities', data['Extracurricular_Activities'])
-        ]]
-
-        final_score = score_model.predict(features)[0]
-        passfail_idx = passfail_model.predict(features)[0]
-        passfail_label = encoders['Pass_Fail'].inverse_transform([passfail_idx])[0]
+    binary = is_binary_request()
+    if binary and request.headers.get("X-Schema-Id") != model.schema_id:
+        return schema_mismatch(model)
+    uncertainty, explain = wants_uncertainty(), wants_explanation()
+    if (uncertainty or explain) and wants_binary():
+        return json_only_options()
 
-        return jsonify({
+    try:
+        with metrics.stage("parse"):
+            if binary:
+                row, valid = wire_format.decode_row(request.get_data(cache=False), model.classes, NUMERIC_RANGES)
+            else:
+                data = request.get_json()
+
+        # Dict lookups compiled at model load; unknown labels and out-of-range numbers
+        # are rejected with one entry per field instead of being silently replaced
+        with metrics.stage("encode"):
+            if binary:
+                problems = [] if valid else BINARY_ROW_PROBLEMS
+            else:
+                row, problems = model.feature_encoder.encode_row(data)
+        if problems:
+            metrics.count_error("predict", "validation")
+            if wants_binary():
+                # Same as an invalid row in a binary batch: a record with STATUS_INVALID
+                return binary_response(model, np.empty(0), np.empty(0), np.zeros(1, dtype=bool))
+            return jsonify({"error": "Invalid input", "details": problems}), 400
+        features = np.array([row], dtype=np.float64)
+
+        # Student_ID is not a feature, so identical students share one cache entry.
+        # Explicit ?backend= requests skip the cache so the backends can be compared;
+        # ?uncertainty=1 requests skip it and the micro-batcher.
+        backend = request.args.get("backend")
+        use_cache = prediction_cache is not None and not backend and not uncertainty
+        cache_key = (model.model_version,) + tuple(row)
+        with metrics.stage("cache"):
+            cached = prediction_cache.get(cache_key) if use_cache else None
+        if cached is not None:
+            final_score, passfail_label = cached
+        else:
+            if uncertainty:
+                scores, passfail_idx, details = model.predict_uncertainty(features, UNCERTAINTY_INTERVAL, backend)
+            elif micro_batcher is not None:
+                scores, passfail_idx = micro_batcher.predict_matrix(model, features, backend)
+            else:
+                scores, passfail_idx = model.predict_matrix(features, backend)
+            final_score = float(scores[0])
+            passfail_label = str(model.decode_passfail(passfail_idx)[0])
+            if use_cache:
+                prediction_cache.put(cache_key, (final_score, passfail_label))
+
+        metrics.count_rows("predict", 1)
+        inputs = model.feature_encoder.decode_row(row) if binary else data
+        log_prediction(model, inputs, final_score, passfail_label, started, cached is not None)
+        if wants_binary():
+            body = wire_format.encode_result(final_score, model.passfail_codes[passfail_label])
+            return Response(body, mimetype=wire_format.CONTENT_TYPE, headers={"X-Schema-Id": model.schema_id})
+        result = {
             "Final_Exam_Score": round(final_score, 2),
             "Pass_Fail": passfail_label
+        }
+        if uncertainty:
+            result["uncertainty"] = uncertainty_fields(model, details)[0]
+        if explain:
+            result["contributions"] = contribution_fields(model, model.explain(features))[0]
+        return jsonify(result)
+    except Exception as e:
+        metrics.count_error("predict", type(e).__name__)
+        return jsonify({"error": str(e)}), 400
+
+@app.route("/predict/batch", methods=["POST"])
+def predict_batch():
+    # JSON or binary rows in; the response format follows Accept either way
+    started = time.perf_counter()
+    model = current_predictor()
+    if model is None:
+        return jsonify({"error": "Model not loaded"}), 500
+    binary = is_binary_request()
+    if binary and request.headers.get("X-Schema-Id") != model.schema_id:
+        return schema_mismatch(model)
+    uncertainty, explain = wants_uncertainty(), wants_explanation()
+    if (uncertainty or explain) and wants_binary():
+        return json_only_options()
+
+    try:
+        with metrics.stage("parse"):
+            if binary:
+                rows = None
+                X_all, valid = wire_format.decode_rows(request.get_data(cache=False), model.classes, NUMERIC_RANGES)
+            else:
+                rows, errors = parse_batch_body()
+    except ValueError as e:
+        metrics.count_error("predict_batch", type(e).__name__)
+        return jsonify({"error": str(e)}), 400
+
+    n_rows = len(X_all) if binary else len(rows)
+    if n_rows > MAX_BATCH_ROWS:
+        return jsonify({"error": f"Batch too large: {n_rows} rows (max {MAX_BATCH_ROWS})"}), 413
+
+    with metrics.stage("encode"):
+        if binary:
+            valid_idx = np.flatnonzero(valid)
+            X = X_all[valid_idx]
+            errors = [None if ok else {"error": "Invalid input", "details": BINARY_ROW_PROBLEMS}
+                      for ok in valid.tolist()]
+            get_inputs = lambda i: model.feature_encoder.decode_row(X_all[i])
+        else:
+            X, valid_idx = encode_batch(model, rows, errors)
+            get_inputs = rows.__getitem__
+    metrics.count_error("predict_batch", "row_validation", n_rows - len(valid_idx))
+    metrics.count_rows("predict_batch", len(valid_idx))
+
+    results = list(errors)
+    scores = passfail_idx = np.empty(0)
+    if len(valid_idx):
+        # One forest call per model for the whole batch
+        try:
+            if uncertainty:
+                scores, passfail_idx, details = model.predict_uncertainty(X, UNCERTAINTY_INTERVAL, request.args.get("backend"))
+            else:
+                scores, passfail_idx = model.predict_matrix(X, request.args.get("backend"))
+        except ValueError as e:
+            metrics.count_error("predict_batch", type(e).__name__)
+            return jsonify({"error": str(e)}), 400
+        log_batch(model, get_inputs, valid_idx, scores, passfail_idx, started)
+    if wants_binary():
+        valid = np.zeros(n_rows, dtype=bool)
+        valid[valid_idx] = True
+        return binary_response(model, scores, passfail_idx, valid)
+
+    if len(valid_idx):
+        labels = model.decode_passfail(passfail_idx)
+        for i, score, label in zip(valid_idx.tolist(), scores.tolist(), labels.tolist()):
+            results[i] = {"Final_Exam_Score": round(score, 2), "Pass_Fail": label}
+        if uncertainty:
+            for i, fields in zip(valid_idx.tolist(), uncertainty_fields(model, details)):
+                results[i]["uncertainty"] = fields
+        if explain:
+            for i, fields in zip(valid_idx.tolist(), contribution_fields(model, model.explain(X))):
+                results[i]["contributions"] = fields
+
+    for i, row in enumerate(rows or ()):
+        if isinstance(row, dict) and "Student_ID" in row:
+            results[i]["Student_ID"] = row["Student_ID"]
+
+    with metrics.stage("serialize"):
+        return jsonify({
+            "model_version": model.model_version,
+            "count": len(results),
+            "errors": len(results) - len(valid_idx),
+            "results": results
         })
+
+
+@app.route("/predict/sweep", methods=["POST"])
+def predict_sweep():
+    # What-if: {"student": {...}, "vary": {feature: {"min", "max", "step"} or {"values": [...]}}}
+    # for one or two features. The whole grid is scored in one forest call (sweep.py).
+    model = current_predictor()
+    if model is None:
+        return jsonify({"error": "Model not loaded"}), 500
+
+    try:
+        with metrics.stage("parse"):
+            data = request.get_json()
+        if not isinstance(data, dict):
+            return jsonify({"error": "Expected a JSON object with student and vary"}), 400
+        with metrics.stage("encode"):
+            row, problems = model.feature_encoder.encode_row(data.get("student"))
+            axes, axis_problems = sweep.parse_axes(data.get("vary"), model.feature_encoder, MAX_BATCH_ROWS)
+            problems += axis_problems
+        if problems:
+            metrics.count_error("predict_sweep", "validation")
+            return jsonify({"error": "Invalid input", "details": problems}), 400
+
+        X = sweep.build_grid(row, axes)
+        scores, passfail_idx = model.predict_matrix(X, request.args.get("backend"))
+        metrics.count_rows("predict_sweep", len(X))
+        with metrics.stage("serialize"):
+            result = sweep.summarize(axes, row, scores, model.decode_passfail(passfail_idx))
+            return jsonify({"model_version": model.model_version, **result})
     except Exception as e:
+        metrics.count_error("predict_sweep", type(e).__name__)
         return jsonify({"error": str(e)}), 400
 
+@app.route("/predict/importances")
+def predict_importances():
+    # Global importances stored in the bundle at training time
+    model = current_predictor()
+    if model is None:
+        return jsonify({"error": "Model not loaded"}), 500
+    if model.importances is None:
+        return jsonify({"error": "This model was trained without importances; retrain it to add them"}), 404
+    return jsonify({"model_version": model.model_version, **model.importances})
+
+@app.route("/predict/schema")
+def predict_schema():
+    # Layout and category indices for the binary row format (wire_format.py)
+    model = current_predictor()
+    if model is None:
+        return jsonify({"error": "Model not loaded"}), 500
+    return jsonify(wire_format.describe(model.classes))
+
+@app.route("/admin/memory")
+def admin_memory():
+    # Memory of the worker that served this request; see memory_report.py for all workers
+    return jsonify(process_memory())
+
+@app.route("/admin/cache")
+def admin_cache():
+    if prediction_cache is None:
+        return jsonify({"backend": "off"})
+    return jsonify(prediction_cache.stats())
+
+@app.route("/admin/prediction-log")
+def admin_prediction_log():
+    # Counters of the worker that served this request
+    if prediction_log is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **prediction_log.stats()})
+
+@app.route("/admin/lookup-table")
+def admin_lookup_table():
+    model = current_predictor()
+    if model is None or model.lookup_table is None:
+        return jsonify({"error": "No lookup table in this model bundle"}), 404
+    return jsonify(model.lookup_table.stats())
+
+@app.route("/admin/model")
+def admin_model():
+    model = current_predictor()
+    info = {"model_version": model.model_version if model else None, "reload": reload_status}
+    if model is not None:
+        info.update({key: model.bundle[key] for key in ("trained_at", "data_checksum", "n_rows")})
+        info["sklearn_loaded"] = model.bundle["sklearn"].loaded
+    info["import_seconds"] = {name: round(seconds, 4) for name, seconds in IMPORT_SECONDS.items()}
+    return jsonify(info)
+
+@app.route("/admin/reload", methods=["POST"])
+def admin_reload():
+    # Reloads MODEL_PATH, or retrains from the CSV with ?train=1, in the background.
+    # A retrained bundle is saved to MODEL_PATH, so the other workers' watchers pick it up.
+    # Retraining is expensive, so the endpoint stays off until a token is configured
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Set ADMIN_TOKEN to enable /admin/reload"}), 403
+    if not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), ADMIN_TOKEN):
+        return jsonify({"error": "Forbidden"}), 403
+    if reload_lock.locked():
+        return jsonify({"error": "A reload is already running", "reload": reload_status}), 409
+
+    train = request.args.get("train") == "1"
+    threading.Thread(target=reload_model, kwargs={"train": train}, daemon=True).start()
+    current_predictor()
+    return jsonify({"status": "started", "train": train}), 202
+
+@app.route("/metrics")
+def metrics_endpoint():
+    # Prometheus text format. Each gunicorn worker keeps its own counters, so a scrape
+    # reflects the worker that answered it.
+    if not metrics.ENABLED:
+        return Response("# metrics disabled (METRICS=off)\n", mimetype="text/plain")
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+def cache_metrics():
+    stats = prediction_cache.stats() if prediction_cache is not None else {}
+    return {(key,): stats[key] for key in ("hits", "misses", "evictions", "expirations", "errors", "size")
+            if stats.get(key) is not None}
+
+
+def model_metrics():
+    model = predictor
+    return {(model.model_version,): 1} if model is not None else {}
+
+
+if metrics.ENABLED:
+    metrics.register(metrics.Gauges("edupredict_prediction_cache", "Prediction cache counters and size.",
+                                    ("stat",), cache_metrics))
+    metrics.register(metrics.Gauges("edupredict_model_info", "Loaded model version.",
+                                    ("version",), model_metrics))
+
 if __name__ == "__main__":
     # This allows the app to use the port Render assigns, or default to 5000 locally
     port = int(os.environ.get("PORT", 5000))
@@ -0,0 +1,279 @@
+# benchmark.py
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import wire_format
+from model_training import StageTimer, train_bundle, save_bundle, FEATURE_COLUMNS
+from predictor import NUMERIC_RANGES
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SAMPLE_ROW = {
+    "Student_ID": 1, "Gender": "Male", "Study_Hours_per_Week": 12, "Attendance_Rate": 95,
+    "Past_Exam_Scores": 85, "Parental_Education_Level": "College",
+    "Internet_Access_at_Home": "Yes", "Extracurricular_Activities": "Yes",
+}
+
+
+# -----------------------------------------
+# SYNTHETIC DATA
+# -----------------------------------------
+def synthetic_frame(n_rows, rng, start_id=0):
+    # Students with the sample.csv schema; the score loosely follows past scores,
+    # attendance and study hours so the forests have real structure to learn
+    frame = pd.DataFrame({
+        "Student_ID": np.arange(start_id, start_id + n_rows),
+        "Gender": rng.choice(["Male", "Female"], n_rows),
+        "Study_Hours_per_Week": rng.integers(0, 41, n_rows),
+        "Attendance_Rate": rng.integers(40, 101, n_rows),
+        "Past_Exam_Scores": rng.integers(30, 101, n_rows),
+        "Parental_Education_Level": rng.choice(["High School", "College", "Graduate"], n_rows),
+        "Internet_Access_at_Home": rng.choice(["Yes", "No"], n_rows),
+        "Extracurricular_Activities": rng.choice(["Yes", "No"], n_rows),
+    })
+    score = (0.45 * frame["Past_Exam_Scores"] + 0.3 * frame["Attendance_Rate"]
+             + 0.8 * frame["Study_Hours_per_Week"] + rng.normal(0, 6, n_rows))
+    frame["Final_Exam_Score"] = score.clip(0, 100).round().astype(int)
+    frame["Pass_Fail"] = np.where(frame["Final_Exam_Score"] >= 60, "Pass", "Fail")
+    return frame
+
+
+def generate_dataset(n_rows, path, seed=0, chunksize=1000000):
+    # Written in chunks so 1e7-row files never need to fit in memory at once
+    rng = np.random.default_rng(seed)
+    with open(path, "w", newline="") as f:
+        for start in range(0, n_rows, chunksize):
+            chunk = synthetic_frame(min(chunksize, n_rows - start), rng, start)
+            chunk.to_csv(f, header=start == 0, index=False)
+    return path
+
+
+# -----------------------------------------
+# MEASUREMENTS
+# -----------------------------------------
+def percentiles(samples_s):
+    ms = np.asarray(samples_s) * 1000
+    return {"p50_ms": round(float(np.percentile(ms, 50)), 3), "p90_ms": round(float(np.percentile(ms, 90)), 3),
+            "p99_ms": round(float(np.percentile(ms, 99)), 3), "mean_ms": round(float(ms.mean()), 3)}
+
+
+def bench_training(csv_path, model_path):
+    timer = StageTimer(verbose=False)
+    start = time.perf_counter()
+    bundle = train_bundle(csv_path, timer=timer)
+    with timer.stage("save"):
+        save_bundle(bundle, model_path)
+    return {
+        "seconds": round(time.perf_counter() - start, 3),
+        "peak_rss_mb": max(stage.get("peak_rss_mb", stage.get("process_peak_rss_mb", 0)) for stage in timer.stages),
+        "stages": timer.stages,
+        "nodes": {"score": bundle["score_forest"].n_nodes, "passfail": bundle["passfail_forest"].n_nodes},
+        "bundle_bytes": os.path.getsize(model_path),
+    }
+
+
+def bench_requests(app_module, n_requests, batch_size, batch_repeats, rng):
+    client = app_module.app.test_client()
+    rows = synthetic_frame(max(n_requests, batch_size), rng).drop(
+        columns=["Final_Exam_Score", "Pass_Fail"]).to_dict("records")
+
+    # Warm up once so first-call costs do not land in the percentiles
+    client.post("/predict", json=rows[0])
+    latencies = []
+    for row in rows[:n_requests]:
+        start = time.perf_counter()
+        response = client.post("/predict", json=row)
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.get_json()
+
+    batch = rows[:batch_size]
+    body = json.dumps(batch)
+    elapsed = []
+    for _ in range(batch_repeats):
+        start = time.perf_counter()
+        response = client.post("/predict/batch", data=body, content_type="application/json")
+        elapsed.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.get_json()
+
+    # Model-only throughput, without HTTP and JSON
+    model = app_module.predictor
+    X, _ = model.encode_frame(pd.DataFrame(batch, columns=FEATURE_COLUMNS))
+    start = time.perf_counter()
+    for _ in range(batch_repeats):
+        model.predict_matrix(X)
+    model_elapsed = (time.perf_counter() - start) / batch_repeats
+
+    return {
+        "predict": percentiles(latencies),
+        "batch": {"rows": batch_size, **percentiles(elapsed),
+                  "rows_per_sec": round(batch_size / float(np.median(elapsed)))},
+        "predict_matrix_rows_per_sec": round(batch_size / model_elapsed),
+    }
+
+
+def pack_rows(rows, classes):
+    records = np.zeros(len(rows), dtype=wire_format.REQUEST_DTYPE)
+    for col in FEATURE_COLUMNS:
+        values = [row[col] for row in rows]
+        records[col] = [classes[col].index(v) for v in values] if col in classes else values
+    return records
+
+
+def bench_wire_format(app_module, n_requests, batch_size, rng):
+    # Per-row cost of turning a request body into a feature row, JSON vs the binary layout,
+    # then the same single-row /predict round trip in both formats
+    model = app_module.predictor
+    rows = synthetic_frame(max(n_requests, batch_size), rng).drop(
+        columns=["Final_Exam_Score", "Pass_Fail"]).to_dict("records")
+    records = pack_rows(rows, model.classes)
+    json_bodies = [json.dumps(row).encode() for row in rows[:n_requests]]
+    binary_bodies = [records[i:i + 1].tobytes() for i in range(n_requests)]
+
+    def per_row_us(parse, bodies):
+        start = time.perf_counter()
+        for body in bodies:
+            parse(body)
+        return round((time.perf_counter() - start) / len(bodies) * 1e6, 3)
+
+    parsing = {
+        "json_row_us": per_row_us(lambda b: model.feature_encoder.encode_row(json.loads(b)), json_bodies),
+        "binary_row_us": per_row_us(
+            lambda b: wire_format.decode_row(b, model.classes, NUMERIC_RANGES), binary_bodies),
+    }
+    json_batch, binary_batch = json.dumps(rows[:batch_size]).encode(), records[:batch_size].tobytes()
+    start = time.perf_counter()
+    frame_rows = json.loads(json_batch)
+    app_module.encode_batch(model, frame_rows, [None] * len(frame_rows))
+    parsing["json_batch_row_us"] = round((time.perf_counter() - start) / batch_size * 1e6, 3)
+    parsing["binary_batch_row_us"] = round(per_row_us(
+        lambda b: wire_format.decode_rows(b, model.classes, NUMERIC_RANGES), [binary_batch]) / batch_size, 4)
+    parsing["bytes_per_row"] = {"json": round(len(json_batch) / batch_size, 1),
+                                "binary": wire_format.REQUEST_DTYPE.itemsize}
+
+    client = app_module.app.test_client()
+    headers = {"Content-Type": wire_format.CONTENT_TYPE, "Accept": wire_format.CONTENT_TYPE,
+               "X-Schema-Id": model.schema_id}
+    latencies = {"json": [], "binary": []}
+    for json_body, binary_body in zip(json_bodies, binary_bodies):
+        start = time.perf_counter()
+        response = client.post("/predict", data=json_body, content_type="application/json")
+        latencies["json"].append(time.perf_counter() - start)
+        assert response.status_code == 200, response.get_json()
+        start = time.perf_counter()
+        response = client.post("/predict", data=binary_body, headers=headers)
+        latencies["binary"].append(time.perf_counter() - start)
+        assert response.status_code == 200, response.data
+    return {"parsing": parsing, "predict": {name: percentiles(samples) for name, samples in latencies.items()}}
+
+
+def bench_uncertainty(app_module, n_requests, batch_size, rng):
+    # Per-row cost of uncertainty outputs against the plain prediction, for each backend:
+    # flat walks both forests once, sklearn calls predict_proba plus predict per score tree
+    model = app_module.predictor
+    rows = synthetic_frame(batch_size, rng).drop(columns=["Final_Exam_Score", "Pass_Fail"]).to_dict("records")
+    X, _ = app_module.encode_batch(model, rows, [None] * len(rows))
+    results = {}
+    for backend in ("flat", "sklearn"):
+        variants = {"plain": lambda X: model.predict_matrix(X, backend),
+                    "uncertainty": lambda X: model.predict_uncertainty(X, backend=backend)}
+        for name, predict in variants.items():
+            start = time.perf_counter()
+            for i in range(n_requests):
+                predict(X[i % len(X)][None, :])
+            single_us = (time.perf_counter() - start) / n_requests * 1e6
+            start = time.perf_counter()
+            predict(X)
+            batch_us = (time.perf_counter() - start) / len(X) * 1e6
+            results[f"{backend}_{name}"] = {"single_row_us": round(single_us, 1), "batch_row_us": round(batch_us, 3)}
+        plain, extra = results[f"{backend}_plain"], results[f"{backend}_uncertainty"]
+        extra["single_vs_plain"] = round(extra["single_row_us"] / plain["single_row_us"], 2)
+        extra["batch_vs_plain"] = round(extra["batch_row_us"] / plain["batch_row_us"], 2)
+    return results
+
+
+def bench_cold_start(model_path):
+    # Fresh interpreter: import app (load bundle) and answer one /predict
+    code = ("import app; c = app.app.test_client(); "
+            f"r = c.post('/predict', json={SAMPLE_ROW!r}); assert r.status_code == 200")
+    env = dict(os.environ, MODEL_PATH=model_path, PREDICTION_CACHE="off", MODEL_WATCH_INTERVAL="0",
+               PREDICTION_LOG="off")
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=BASE_DIR, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    return {"seconds_to_first_prediction": round(time.perf_counter() - start, 3)}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark training and prediction on synthetic data.")
+    parser.add_argument("--sizes", default="1000,100000", help="comma-separated dataset sizes (rows)")
+    parser.add_argument("--requests", type=int, default=500, help="single /predict calls to time")
+    parser.add_argument("--batch-size", type=int, default=10000, help="rows per /predict/batch call")
+    parser.add_argument("--batch-repeats", type=int, default=5)
+    parser.add_argument("--output", default="benchmark.json", help="JSON results file")
+    parser.add_argument("--workdir", default=None, help="where to keep datasets and bundles (default: temp dir)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    sizes = [int(float(size)) for size in args.sizes.split(",")]
+    workdir = args.workdir or tempfile.mkdtemp(prefix="edupredict-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    rng = np.random.default_rng(args.seed)
+
+    import sklearn
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "cpus": os.cpu_count(),
+        "runs": [],
+    }
+
+    app_module = None
+    for size in sizes:
+        print(f"▶ {size:,} rows", file=sys.stderr)
+        csv_path = generate_dataset(size, os.path.join(workdir, f"students_{size}.csv"), args.seed)
+        model_path = os.path.join(workdir, f"model_{size}.pkl")
+        run = {"rows": size, "training": bench_training(csv_path, model_path)}
+
+        if app_module is None:
+            # The app reads its settings at import; keep the cache, watcher and log out of the numbers
+            os.environ.update(MODEL_PATH=model_path, PREDICTION_CACHE="off", MODEL_WATCH_INTERVAL="0",
+                              PREDICTION_LOG="off")
+            import app as app_module
+        else:
+            app_module.MODEL_PATH = model_path
+            app_module.reload_model()
+
+        run["serving"] = bench_requests(app_module, args.requests, args.batch_size, args.batch_repeats, rng)
+        run["wire_format"] = bench_wire_format(app_module, args.requests, args.batch_size, rng)
+        run["uncertainty"] = bench_uncertainty(app_module, args.requests, args.batch_size, rng)
+        run["cold_start"] = bench_cold_start(model_path)
+        results["runs"].append(run)
+        print(json.dumps(run, indent=2), file=sys.stderr)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved benchmark results to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
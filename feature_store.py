@@ -0,0 +1,166 @@
+# feature_store.py
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no cross-process lock, the manifest is still replaced atomically
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from model_bundle import BASE_DIR, FEATURE_COLUMNS, NUMERIC_COLUMNS, TARGET_COLUMNS, LABEL_COLUMNS
+
+DEFAULT_CACHE_DIR = os.environ.get("FEATURE_CACHE_DIR", os.path.join(BASE_DIR, "cache", "features"))
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_training_csv(csv_path, chunksize):
+    # Reads the CSV in chunks with compact dtypes: label columns as category, numeric
+    # features as the smallest integer type (or float32, which is what the trees split on
+    # anyway), and an integer target downcast only when it is integral.
+    dtypes = {col: "category" for col in LABEL_COLUMNS}
+    parts = {col: [] for col in FEATURE_COLUMNS + TARGET_COLUMNS}
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize, dtype=dtypes,
+                             usecols=FEATURE_COLUMNS + TARGET_COLUMNS):
+        for col in parts:
+            values = chunk[col]
+            if col in NUMERIC_COLUMNS:
+                values = pd.to_numeric(values, downcast="integer")
+                if values.dtype.kind == "f":
+                    values = values.astype(np.float32)
+            elif col == 'Final_Exam_Score':
+                values = pd.to_numeric(values, downcast="integer")
+            parts[col].append(values)
+
+    frame = {}
+    for col, values in parts.items():
+        if col in LABEL_COLUMNS:
+            # Sorted categories give the same codes as LabelEncoder.fit_transform
+            frame[col] = pd.Series(union_categoricals(values, sort_categories=True))
+        else:
+            frame[col] = pd.Series(np.concatenate([v.to_numpy() for v in values]))
+    return pd.DataFrame(frame)
+
+
+class FeatureStore:
+    # Columnar cache of parsed training CSVs. Each source file is parsed once into one .npy
+    # file per column (label columns as their category codes, plus the sorted categories),
+    # stored under the SHA-256 of the file's contents and memory-mapped on later loads.
+    # A manifest remembers each path's size, mtime and checksum, so unchanged files are
+    # not even re-hashed; a changed file is re-ingested and its stale entry deleted.
+    # Several processes may share the cache: manifest updates are serialized with a lock
+    # file, and only the entry a path's new checksum replaced is ever deleted, since any
+    # other entry may be memory-mapped by another process.
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.manifest_path = os.path.join(cache_dir, "manifest.json")
+        self.lock_path = os.path.join(cache_dir, "manifest.lock")
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self, manifest):
+        # A unique temporary file per writer, renamed over the manifest in one step
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix="manifest.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(tmp_path, self.manifest_path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+
+    @contextlib.contextmanager
+    def _manifest_lock(self):
+        # Held from reading the manifest to replacing it, so concurrent updates are not lost
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.lock_path, "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def checksum(self, path):
+        # SHA-256 of the file, reused from the manifest while size and mtime are unchanged
+        key = os.path.abspath(path)
+        stat = os.stat(path)
+        entry = self._read_manifest().get(key)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["checksum"]
+
+        # Hashed outside the lock; only the manifest update is serialized
+        checksum = file_checksum(path)
+        with self._manifest_lock():
+            manifest = self._read_manifest()
+            previous = manifest.get(key)
+            manifest[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "checksum": checksum}
+            self._write_manifest(manifest)
+            if previous and previous["checksum"] != checksum:
+                self._remove_superseded(manifest, previous["checksum"])
+        return checksum
+
+    def entry_dir(self, checksum):
+        return os.path.join(self.cache_dir, checksum)
+
+    def load(self, path, chunksize):
+        # The same frame read_training_csv returns, from the cache when possible
+        entry = self.entry_dir(self.checksum(path))
+        if not os.path.exists(os.path.join(entry, "meta.json")):
+            self.ingest(path, entry, chunksize)
+
+        with open(os.path.join(entry, "meta.json")) as f:
+            meta = json.load(f)
+        frame = {}
+        for col in FEATURE_COLUMNS + TARGET_COLUMNS:
+            values = np.load(os.path.join(entry, f"{col}.npy"), mmap_mode="r")
+            if col in LABEL_COLUMNS:
+                values = pd.Categorical.from_codes(values, categories=meta["categories"][col])
+            frame[col] = pd.Series(values)
+        return pd.DataFrame(frame)
+
+    def ingest(self, path, entry, chunksize):
+        frame = read_training_csv(path, chunksize)
+        tmp_dir = f"{entry}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        categories = {}
+        for col in frame.columns:
+            if col in LABEL_COLUMNS:
+                categories[col] = [str(label) for label in frame[col].cat.categories]
+                values = frame[col].cat.codes.to_numpy()
+            else:
+                values = frame[col].to_numpy()
+            np.save(os.path.join(tmp_dir, f"{col}.npy"), values)
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump({"source": os.path.abspath(path), "n_rows": len(frame), "categories": categories}, f)
+        # Readers only ever see a complete entry
+        try:
+            os.rename(tmp_dir, entry)
+        except OSError:
+            # Another process ingested the same file first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _remove_superseded(self, manifest, checksum):
+        # The entry of a path's old contents, unless another path still has those contents
+        if all(entry["checksum"] != checksum for entry in manifest.values()):
+            shutil.rmtree(self.entry_dir(checksum), ignore_errors=True)
@@ -0,0 +1,218 @@
+# flat_forest.py
+import numpy as np
+
+# Storage options for thresholds and leaf values, see FlatForest.compact
+PRECISIONS = ("float64", "float32", "uint16")
+
+
+class FlatForest:
+    # All trees of a fitted sklearn forest packed into contiguous node arrays.
+    # Child indices are global, and leaves point at themselves, so every tree can be
+    # walked in lock-step for a fixed number of steps without any per-tree Python calls.
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, classes=None,
+                 value_scale=None, value_offset=None, precision="float64"):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        # Classifier labels in predict_proba column order (None for regressors)
+        self.classes = classes
+        # Quantized leaf values decode as value_offset + value * value_scale
+        self.value_scale = value_scale
+        self.value_offset = value_offset
+        self.precision = precision
+
+    @classmethod
+    def from_sklearn(cls, model):
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            is_leaf = tree.children_left == -1
+            ids = np.arange(offset, offset + n)
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(is_leaf, ids, tree.children_left + offset))
+            rights.append(np.where(is_leaf, ids, tree.children_right + offset))
+
+            value = tree.value[:, 0, :]
+            if value.shape[1] > 1:
+                # Older sklearn stores class counts instead of fractions; normalize like
+                # DecisionTreeClassifier.predict_proba does there
+                totals = value.sum(axis=1, keepdims=True)
+                if not np.allclose(totals, 1.0):
+                    totals[totals == 0.0] = 1.0
+                    value = value / totals
+            values.append(value)
+            roots.append(offset)
+            offset += n
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max(estimator.tree_.max_depth for estimator in model.estimators_),
+            classes=getattr(model, "classes_", None),
+        )
+
+    def compact(self, precision="float64"):
+        # A smaller copy for serving. Node indices shrink to int32, features to int8 and
+        # thresholds to float32, all exactly: inputs are compared in float32, and rounding
+        # each threshold down to the nearest float32 sends every float32 input the same way.
+        # Leaf values stay float64 unless precision is "float32", or "uint16" (quantized to
+        # 65536 levels over their range). Those change outputs slightly, so the flat backend
+        # no longer matches sklearn bit for bit; model_size.py measures by how much.
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision {precision!r}; expected one of {PRECISIONS}")
+        index_dtype = np.int32 if self.n_nodes < 2 ** 31 else np.intp
+        threshold = self.threshold.astype(np.float32)
+        rounded_up = threshold.astype(np.float64) > self.threshold
+        threshold[rounded_up] = np.nextafter(threshold[rounded_up], np.float32(-np.inf))
+
+        value = self.value.astype(np.float64)
+        if self.value_scale is not None:
+            value = value * self.value_scale + self.value_offset
+        scale = offset = None
+        if precision == "float32":
+            value = value.astype(np.float32)
+        elif precision == "uint16":
+            offset = float(value.min())
+            scale = (float(value.max()) - offset) / 65535 or 1.0
+            value = np.round((value - offset) / scale).astype(np.uint16)
+        return FlatForest(
+            feature=self.feature.astype(np.int8 if self.feature.max(initial=0) < 128 else np.intp),
+            threshold=threshold,
+            left=self.left.astype(index_dtype),
+            right=self.right.astype(index_dtype),
+            value=np.ascontiguousarray(value),
+            roots=self.roots.astype(index_dtype),
+            max_depth=self.max_depth,
+            classes=self.classes,
+            value_scale=scale,
+            value_offset=offset,
+            precision=precision,
+        )
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.left,
+                                      self.right, self.value, self.roots))
+
+    def apply(self, X):
+        # sklearn compares float32 inputs against float64 thresholds; do the same (or use
+        # float32 thresholds rounded down, see compact) so every split goes the same way
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        row_offset = (np.arange(n_rows, dtype=np.intp) * n_features)[:, None]
+
+        node = np.repeat(self.roots[None, :], n_rows, axis=0)
+        for _ in range(self.max_depth):
+            go_left = flat_X[row_offset + self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def predict_mean(self, X):
+        return self.mean_of(self.value[self.apply(X).T])
+
+    def mean_of(self, leaf_values):
+        # Mean of stored leaf values (n_trees, n_rows, n_outputs) over trees. Trees are
+        # summed in order, as RandomForest*.predict does, rather than with NumPy's pairwise sum.
+        total = np.add.accumulate(leaf_values, axis=0, dtype=np.float64)[-1]
+        total /= len(self.roots)
+        return self.decode(total)
+
+    def decode(self, values):
+        # Stored (possibly quantized) leaf values, or means of them, as float64
+        if self.value_scale is not None:
+            return values * self.value_scale + self.value_offset
+        return values.astype(np.float64, copy=False)
+
+    def contributions(self, X, outputs=None):
+        # Path-based decomposition of predict_mean (Saabas): every split a row passes through
+        # credits the change in node value from parent to child to the split feature.
+        # Returns (bias, contributions): bias (n_outputs,) is the mean root value and
+        # contributions has shape (n_rows, n_features, n_outputs), averaged over trees, so
+        # bias + contributions.sum(axis=1) equals predict_mean(X) up to rounding. Costs one
+        # extra gather and bincount per level and output on top of apply's walk; `outputs`
+        # limits the work to some output columns (e.g. one class of a classifier).
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        outputs = list(range(self.value.shape[1])) if outputs is None else list(outputs)
+        n_outputs = len(outputs)
+        flat_X = X.ravel()
+        row_offset = (np.arange(n_rows, dtype=np.intp) * n_features)[:, None]
+
+        totals = np.zeros((n_outputs, n_rows * n_features))
+        node = np.repeat(self.roots[None, :], n_rows, axis=0)
+        for _ in range(self.max_depth):
+            feature = self.feature[node]
+            go_left = flat_X[row_offset + feature] <= self.threshold[node]
+            child = np.where(go_left, self.left[node], self.right[node])
+            slots = (row_offset + feature).ravel()
+            for k, output in enumerate(outputs):
+                # Leaves point at themselves, so rows that already reached one add zero
+                delta = self.value[child, output].astype(np.float64) - self.value[node, output]
+                totals[k] += np.bincount(slots, weights=delta.ravel(), minlength=n_rows * n_features)
+            node = child
+
+        contributions = totals.T.reshape(n_rows, n_features, n_outputs) / len(self.roots)
+        if self.value_scale is not None:
+            # The offset cancels in every difference
+            contributions *= self.value_scale
+        bias = self.mean_of(self.value[self.roots][:, None, outputs])[0]
+        return bias, contributions
+
+    def predict_regression(self, X):
+        return self.predict_mean(X)[:, 0]
+
+    def predict_proba(self, X):
+        return self.predict_mean(X)
+
+
+class ForestGroup:
+    # Several flat forests over the same features, walked in a single traversal: their
+    # node arrays are concatenated (child indices shifted) into one forest whose leaves are
+    # split back per forest afterwards. Used when every tree's leaf is needed from more than
+    # one forest, e.g. for the spread of the score trees plus the pass/fail probabilities.
+
+    def __init__(self, forests):
+        self.forests = forests
+        sizes = [forest.n_nodes for forest in forests]
+        self.node_offsets = np.cumsum([0] + sizes[:-1])
+        self.tree_bounds = np.cumsum([0] + [len(forest.roots) for forest in forests])
+        index_dtype = np.int32 if sum(sizes) < 2 ** 31 else np.intp
+
+        def shifted(name):
+            return np.concatenate([getattr(forest, name).astype(np.intp) + offset
+                                   for forest, offset in zip(forests, self.node_offsets)]).astype(index_dtype)
+
+        self.walker = FlatForest(
+            feature=np.concatenate([forest.feature for forest in forests]),
+            threshold=np.concatenate([forest.threshold for forest in forests]),
+            left=shifted("left"),
+            right=shifted("right"),
+            value=None,
+            roots=shifted("roots"),
+            max_depth=max(forest.max_depth for forest in forests),
+        )
+
+    def leaf_values(self, X):
+        # Stored leaf values of every tree, one (n_trees, n_rows, n_outputs) array per forest
+        nodes = self.walker.apply(X).T
+        return [forest.value[nodes[start:stop] - offset]
+                for forest, offset, start, stop in zip(self.forests, self.node_offsets,
+                                                       self.tree_bounds[:-1], self.tree_bounds[1:])]
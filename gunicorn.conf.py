@@ -0,0 +1,30 @@
+# gunicorn.conf.py
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+# More than one thread switches gunicorn to gthread workers; SERVING_MODE=microbatch
+# needs this so concurrent requests can be batched together
+threads = int(os.environ.get("GUNICORN_THREADS", 1))
+
+# Load app.py (and the model bundle) once in the master, then fork the workers.
+# The forests are never written after loading, so their pages stay shared copy-on-write.
+preload_app = True
+# Unpickle the sklearn forests in the master too (see app.py); a worker that unpickled them
+# on first use would hold its own copy
+os.environ.setdefault("LAZY_SKLEARN", "0")
+
+
+def when_ready(server):
+    # Move everything loaded so far out of the GC's reach; otherwise a collection in a
+    # worker touches every object header and un-shares the pages holding them
+    gc.collect()
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    from memory_report import process_memory
+    stats = process_memory()
+    worker.log.info("worker %s memory: rss=%s kB pss=%s kB", worker.pid,
+                    stats.get("rss_kb"), stats.get("pss_kb"))
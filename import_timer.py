@@ -0,0 +1,50 @@
+# import_timer.py
+# Per-package import times for a block of imports, like `python -X importtime` but
+# summarized: each top-level package is charged only for its own modules, not for the
+# other packages it imports.
+import builtins
+import sys
+import time
+
+_original_import = builtins.__import__
+_totals = {}
+_stack = []
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+
+    package = name.partition(".")[0]
+    _stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - start
+        nested = _stack.pop()
+        _totals[package] = _totals.get(package, 0.0) + elapsed - nested
+        if _stack:
+            _stack[-1] += elapsed
+
+
+def start():
+    _totals.clear()
+    builtins.__import__ = _timed_import
+
+
+def stop(min_seconds=0.005):
+    # Returns {package: seconds} for packages that took at least min_seconds, slowest first;
+    # the rest are summed under "(other)"
+    builtins.__import__ = _original_import
+    slow = sorted(((name, seconds) for name, seconds in _totals.items() if seconds >= min_seconds),
+                  key=lambda item: -item[1])
+    result = dict(slow)
+    result["(other)"] = sum(_totals.values()) - sum(result.values())
+    return result
+
+
+def summary(seconds_by_package, limit=5):
+    total = sum(seconds_by_package.values())
+    top = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in list(seconds_by_package.items())[:limit])
+    return f"{total:.2f}s ({top})"
@@ -0,0 +1,241 @@
+# load_test.py
+import argparse
+import glob
+import gzip
+import http.client
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+
+import numpy as np
+
+from benchmark import BASE_DIR, percentiles, synthetic_frame
+from model_bundle import FEATURE_COLUMNS
+
+
+# -----------------------------------------
+# TRAFFIC
+# -----------------------------------------
+def read_log_rows(patterns):
+    # Inputs from prediction logs (logs/predictions-*.jsonl[.gz], see prediction_log.py),
+    # or any JSONL file of plain student objects with the sample.csv columns
+    rows = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            opener = gzip.open if path.endswith(".gz") else open
+            with opener(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    row = record.get("inputs", record)
+                    if all(col in row for col in FEATURE_COLUMNS):
+                        rows.append(row)
+    return rows
+
+
+def synthetic_rows(n_rows, seed):
+    frame = synthetic_frame(n_rows, np.random.default_rng(seed))
+    return frame.drop(columns=["Final_Exam_Score", "Pass_Fail"]).to_dict("records")
+
+
+def build_requests(rows, endpoint, batch_size):
+    # (path, body) pairs, replayed round-robin
+    if endpoint == "batch":
+        return [("/predict/batch", json.dumps(rows[i:i + batch_size], default=str).encode())
+                for i in range(0, len(rows), batch_size)]
+    return [("/predict", json.dumps(row, default=str).encode()) for row in rows]
+
+
+# -----------------------------------------
+# LOAD GENERATION
+# -----------------------------------------
+def connection_factory(url):
+    # Returns (make a connection, path prefix) for an http:// or https:// base URL; the
+    # prefix is the URL's path, for servers mounted below the root
+    url = urllib.parse.urlsplit(url)
+    if url.scheme not in ("http", "https"):
+        raise ValueError(f"Unsupported URL scheme {url.scheme!r}; expected http or https")
+    if url.scheme == "https":
+        connection, default_port = http.client.HTTPSConnection, 443
+    else:
+        connection, default_port = http.client.HTTPConnection, 80
+    host, port = url.hostname, url.port or default_port
+    return (lambda: connection(host, port, timeout=30)), url.path.rstrip("/")
+
+
+def run_load(url, requests, connections, rps, duration, max_requests):
+    # connections threads, each with one keep-alive HTTP/1.1 connection. With rps > 0 the
+    # sends follow a fixed schedule (open loop) and latency is measured from the scheduled
+    # time, so a stalled server shows up as queueing delay instead of hiding it; with rps = 0
+    # each connection sends as fast as responses come back.
+    connect, prefix = connection_factory(url)
+    counter = itertools.count()
+    lock = threading.Lock()
+    latencies, statuses = [], {}
+    started = time.perf_counter()
+    deadline = started + duration if duration else float("inf")
+
+    def worker():
+        conn = connect()
+        local_latencies, local_statuses = [], {}
+        while True:
+            with lock:
+                i = next(counter)
+            if (max_requests and i >= max_requests) or time.perf_counter() >= deadline:
+                break
+            send_at = started + i / rps if rps else time.perf_counter()
+            delay = send_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            path, body = requests[i % len(requests)]
+            try:
+                conn.request("POST", prefix + path, body, {"Content-Type": "application/json"})
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException) as e:
+                status = type(e).__name__
+                conn.close()
+                conn = connect()
+            local_latencies.append(time.perf_counter() - send_at)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+        conn.close()
+        with lock:
+            latencies.extend(local_latencies)
+            for status, n in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + n
+
+    threads = [threading.Thread(target=worker) for _ in range(connections)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    total = len(latencies)
+    errors = sum(n for status, n in statuses.items() if status != 200)
+    return {
+        "requests": total,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "statuses": {str(status): n for status, n in sorted(statuses.items(), key=str)},
+        **(percentiles(latencies) if latencies else {}),
+    }
+
+
+# -----------------------------------------
+# LOCAL SERVERS
+# -----------------------------------------
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(env_overrides, timeout=120):
+    # gunicorn with gunicorn.conf.py on a free port, with the given settings on top of ours
+    port = free_port()
+    env = dict(os.environ, PORT=str(port), **env_overrides)
+    process = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+                               cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    give_up = time.monotonic() + timeout
+    while time.monotonic() < give_up:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {process.returncode} ({env_overrides})")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/admin/model")
+            if conn.getresponse().status == 200:
+                return process, port
+        except OSError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"gunicorn did not answer within {timeout}s ({env_overrides})")
+
+
+def parse_config(spec):
+    # "name:KEY=VALUE,KEY=VALUE" -> (name, {KEY: VALUE})
+    name, _, settings = spec.partition(":")
+    env = dict(item.split("=", 1) for item in settings.split(",") if item)
+    return name, env
+
+
+def print_table(results):
+    columns = ["requests", "throughput_rps", "error_rate", "p50_ms", "p90_ms", "p99_ms", "mean_ms"]
+    print(f"{'config':<16}" + "".join(f"{col:>16}" for col in columns))
+    for name, result in results.items():
+        print(f"{name:<16}" + "".join(f"{result.get(col, ''):>16}" for col in columns))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded or synthetic traffic against the server.")
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="server to hit when no --config is given (http or https; a path is prefixed to the endpoints)")
+    parser.add_argument("--config", action="append", default=[], metavar="NAME:KEY=VALUE,...",
+                        help="start a local gunicorn with these settings and test it; repeat to compare, "
+                             "e.g. --config direct:SERVING_MODE=direct --config mb:SERVING_MODE=microbatch,GUNICORN_THREADS=8")
+    parser.add_argument("--log", action="append", default=[],
+                        help="JSONL traffic to replay (glob; .gz ok), e.g. 'logs/predictions-*.jsonl*'")
+    parser.add_argument("--synthetic", type=int, default=10000, help="synthetic students when no --log is given")
+    parser.add_argument("--endpoint", choices=["predict", "batch"], default="predict")
+    parser.add_argument("--batch-size", type=int, default=100, help="rows per /predict/batch call")
+    parser.add_argument("--connections", type=int, default=8, help="concurrent keep-alive connections")
+    parser.add_argument("--rps", type=float, default=0, help="target requests/sec (0 = as fast as possible)")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per run (0 = until --requests)")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests (0 = no limit)")
+    parser.add_argument("--warmup", type=int, default=0,
+                        help="requests sent (and not measured) before each run, e.g. to load pandas in every worker")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="also write the results as JSON")
+    args = parser.parse_args(argv)
+    if not args.duration and not args.requests:
+        parser.error("set --duration or --requests")
+
+    rows = read_log_rows(args.log) if args.log else synthetic_rows(args.synthetic, args.seed)
+    if not rows:
+        raise SystemExit("❌ ERROR: no replayable rows found in " + ", ".join(args.log))
+    requests = build_requests(rows, args.endpoint, args.batch_size)
+    print(f"Replaying {len(requests):,} distinct {args.endpoint} requests over {args.connections} connections"
+          f" at {args.rps or 'max'} rps", file=sys.stderr)
+
+    def run(url):
+        if args.warmup:
+            run_load(url, requests, args.connections, 0, 0, args.warmup)
+        return run_load(url, requests, args.connections, args.rps, args.duration, args.requests)
+
+    results = {}
+    if args.config:
+        for spec in args.config:
+            name, env = parse_config(spec)
+            print(f"▶ {name}: {env}", file=sys.stderr)
+            process, port = start_server(env)
+            try:
+                results[name] = dict(run(f"http://127.0.0.1:{port}"), settings=env)
+            finally:
+                process.terminate()
+                process.wait(30)
+    else:
+        try:
+            connection_factory(args.url)
+        except ValueError as e:
+            parser.error(str(e))
+        url = urllib.parse.urlsplit(args.url)
+        results[url.netloc + url.path.rstrip("/")] = run(args.url)
+
+    print_table(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved load test results to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# lookup_table.py
+import time
+
+import numpy as np
+
+from model_bundle import FEATURE_COLUMNS, CATEGORICAL_COLUMNS
+
+# (start, stop, step) per numeric input; stop is inclusive
+DEFAULT_GRID = {
+    "Study_Hours_per_Week": (0, 40, 1),
+    "Attendance_Rate": (0, 100, 1),
+    "Past_Exam_Scores": (0, 100, 1),
+}
+
+
+def parse_grid(spec):
+    # "Study_Hours_per_Week=0:40:1,Attendance_Rate=50:100:1" -> DEFAULT_GRID with those axes replaced
+    grid = dict(DEFAULT_GRID)
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, bounds = part.partition("=")
+        if name not in grid:
+            raise ValueError(f"Not a numeric feature: {name}")
+        start, stop, step = (float(v) for v in bounds.split(":"))
+        grid[name] = (start, stop, step)
+    return grid
+
+
+class LookupTable:
+    # Dense table of both models' outputs over every combination of the categorical
+    # classes and the numeric grid, indexed in FEATURE_COLUMNS order.
+
+    def __init__(self, axes, scores, passfail, max_deviation, build_seconds):
+        self.axes = axes
+        self.scores = scores
+        self.passfail = passfail
+        self.max_deviation = max_deviation
+        self.build_seconds = build_seconds
+
+    @classmethod
+    def build(cls, score_model, passfail_model, encoders, grid=None, chunk_size=500000):
+        grid = grid or DEFAULT_GRID
+        axes = []
+        for col in FEATURE_COLUMNS:
+            if col in CATEGORICAL_COLUMNS:
+                axes.append((0.0, 1.0, len(encoders[col].classes_)))
+            else:
+                start, stop, step = grid[col]
+                axes.append((float(start), float(step), int(round((stop - start) / step)) + 1))
+
+        start_time = time.perf_counter()
+        shape = tuple(n for _, _, n in axes)
+        total = int(np.prod(shape))
+        scores = np.empty(total, dtype=np.float32)
+        passfail = np.empty(total, dtype=np.uint8)
+        max_deviation = 0.0
+
+        for lo in range(0, total, chunk_size):
+            hi = min(lo + chunk_size, total)
+            idx = np.unravel_index(np.arange(lo, hi), shape)
+            X = np.column_stack([start + i * step for (start, step, _), i in zip(axes, idx)])
+            exact = score_model.predict(X)
+            scores[lo:hi] = exact
+            passfail[lo:hi] = passfail_model.predict(X)
+            max_deviation = max(max_deviation, float(np.abs(scores[lo:hi] - exact).max()))
+
+        return cls(axes, scores.reshape(shape), passfail.reshape(shape),
+                   max_deviation, time.perf_counter() - start_time)
+
+    @property
+    def nbytes(self):
+        return self.scores.nbytes + self.passfail.nbytes
+
+    def lookup(self, X):
+        # Returns (scores, passfail labels, on_grid mask); rows off the grid are left at 0
+        positions = []
+        on_grid = np.ones(len(X), dtype=bool)
+        for j, (start, step, n) in enumerate(self.axes):
+            pos = (X[:, j] - start) / step
+            rounded = np.rint(pos)
+            on_grid &= (np.abs(pos - rounded) < 1e-9) & (rounded >= 0) & (rounded < n)
+            positions.append(rounded)
+
+        scores = np.zeros(len(X), dtype=np.float64)
+        passfail = np.zeros(len(X), dtype=np.int64)
+        if on_grid.any():
+            flat = np.ravel_multi_index(tuple(p[on_grid].astype(np.intp) for p in positions),
+                                        self.scores.shape)
+            scores[on_grid] = self.scores.reshape(-1)[flat]
+            passfail[on_grid] = self.passfail.reshape(-1)[flat]
+        return scores, passfail, on_grid
+
+    def stats(self):
+        return {
+            "shape": list(self.scores.shape),
+            "cells": int(self.scores.size),
+            "bytes": int(self.nbytes),
+            "max_score_deviation": self.max_deviation,
+            "build_seconds": round(self.build_seconds, 3),
+            "grid": {col: {"start": start, "step": step, "points": n}
+                     for col, (start, step, n) in zip(FEATURE_COLUMNS, self.axes)
+                     if col not in CATEGORICAL_COLUMNS},
+        }
@@ -0,0 +1,71 @@
+# memory_report.py
+import os
+import sys
+
+# Fields read from /proc/<pid>/smaps_rollup, reported in kB.
+# Pss splits shared pages evenly between the processes mapping them, so summing Pss
+# across gunicorn workers gives the real footprint; Rss counts shared pages once per worker.
+FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def process_memory(pid="self"):
+    stats = {"pid": os.getpid() if pid == "self" else int(pid)}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in FIELDS:
+                    stats[key.lower() + "_kb"] = int(rest.split()[0])
+    except OSError:
+        # Not Linux (or no permission): fall back to peak RSS from the resource module
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        stats["rss_kb"] = peak // 1024 if sys.platform == "darwin" else peak
+    return stats
+
+
+def reset_peak_rss():
+    # Linux: writing 5 to clear_refs resets this process's peak RSS (VmHWM) to its current
+    # RSS, so a later peak_rss_kb() covers only what ran in between. False where unsupported.
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_kb():
+    # VmHWM from /proc/self/status, or None when it cannot be read
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def child_pids(pid):
+    pids = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            pids.extend(int(p) for p in f.read().split())
+    return pids
+
+
+if __name__ == "__main__":
+    # Usage: python memory_report.py <gunicorn master pid>
+    if len(sys.argv) != 2:
+        raise SystemExit("usage: python memory_report.py <gunicorn-master-pid>")
+
+    master = int(sys.argv[1])
+    rows = [("master", process_memory(master))]
+    rows += [("worker", process_memory(pid)) for pid in child_pids(master)]
+
+    print(f"{'role':<8}{'pid':>8}" + "".join(f"{field:>15}" for field in FIELDS))
+    for role, stats in rows:
+        print(f"{role:<8}{stats['pid']:>8}" + "".join(f"{stats.get(field.lower() + '_kb', 0):>15}" for field in FIELDS))
+    total_pss = sum(stats.get("pss_kb", 0) for _, stats in rows)
+    print(f"Total PSS: {total_pss / 1024:.1f} MB across {len(rows)} processes")
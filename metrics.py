@@ -0,0 +1,166 @@
+# metrics.py
+import contextvars
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+
+# METRICS=off turns every timer and counter below into a no-op
+ENABLED = os.environ.get("METRICS", "on") != "off"
+
+# Seconds; request stages run from microseconds (encoding) to seconds (large batches)
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        # Bucket counts are stored per bucket and summed into cumulative form on render
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Gauges:
+    # Values computed at scrape time by a callback returning {labels tuple: value}
+    def __init__(self, name, help_text, labelnames, callback):
+        self.name, self.help, self.labelnames, self.callback = name, help_text, tuple(labelnames), callback
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for labels, value in sorted(self.callback().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+# -----------------------------------------
+# REGISTRY
+# -----------------------------------------
+registry = []
+
+
+def register(metric):
+    registry.append(metric)
+    return metric
+
+
+def render():
+    # Prometheus text exposition format, version 0.0.4
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+REQUEST_STAGE_SECONDS = register(Histogram(
+    "edupredict_request_stage_seconds", "Time spent in each stage of the prediction request path.",
+    ("endpoint", "stage")))
+TRAINING_STAGE_SECONDS = register(Histogram(
+    "edupredict_training_stage_seconds", "Time spent in each stage of model loading and training.",
+    ("stage",), buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)))
+REQUESTS = register(Counter(
+    "edupredict_requests_total", "HTTP requests by endpoint and status code.", ("endpoint", "status")))
+ERRORS = register(Counter(
+    "edupredict_errors_total", "Prediction errors by endpoint and error type.", ("endpoint", "type")))
+ROWS = register(Counter(
+    "edupredict_predicted_rows_total", "Rows scored, by endpoint.", ("endpoint",)))
+
+
+@contextmanager
+def _timed(histogram, *labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - start, *labels)
+
+
+_NULL = nullcontext()
+
+
+# Endpoint whose stages the current thread is timing. Set per request by app.py, so stages
+# timed below the handler (predictor.py) are labelled without being passed the endpoint.
+_endpoint = contextvars.ContextVar("endpoint", default="none")
+
+
+def set_endpoint(endpoint):
+    _endpoint.set(endpoint)
+
+
+def stage(name, endpoint=None):
+    # with metrics.stage("encode"): ... records into edupredict_request_stage_seconds,
+    # labelled with the endpoint passed in or the current one (set_endpoint)
+    return _timed(REQUEST_STAGE_SECONDS, endpoint or _endpoint.get(), name) if ENABLED else _NULL
+
+
+def training_stage(name):
+    return _timed(TRAINING_STAGE_SECONDS, name) if ENABLED else _NULL
+
+
+def observe_training_stage(name, seconds):
+    if ENABLED:
+        TRAINING_STAGE_SECONDS.observe(seconds, name)
+
+
+def count_request(endpoint, status):
+    if ENABLED:
+        REQUESTS.inc(endpoint, status)
+
+
+def count_error(endpoint, error_type, amount=1):
+    if ENABLED and amount:
+        ERRORS.inc(endpoint, error_type, amount=amount)
+
+
+def count_rows(endpoint, amount):
+    if ENABLED and amount:
+        ROWS.inc(endpoint, amount=amount)
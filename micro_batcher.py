@@ -0,0 +1,100 @@
+# micro_batcher.py
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+import metrics
+
+BATCH_ROWS = metrics.register(metrics.Histogram(
+    "edupredict_microbatch_rows", "Rows per micro-batch sent to the models.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512)))
+
+
+class _Pending:
+    __slots__ = ("model", "X", "backend", "done", "result", "error")
+
+    def __init__(self, model, X, backend):
+        self.model, self.X, self.backend = model, X, backend
+        self.done = threading.Event()
+        self.result = self.error = None
+
+
+class MicroBatcher:
+    # Collects concurrent prediction requests for up to max_wait_ms (or until max_rows rows
+    # are waiting), scores them as one matrix and hands each caller its own rows back.
+    # Only useful with a threaded server (gunicorn --threads / gthread workers).
+
+    def __init__(self, max_wait_ms=2.0, max_rows=64):
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_rows = max_rows
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        # The queue and thread are created per process: neither survives a gunicorn fork
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                threading.Thread(target=self._run, name="micro-batcher", daemon=True).start()
+                self._pid = os.getpid()
+
+    def predict_matrix(self, model, X, backend=None):
+        # Same contract as Predictor.predict_matrix; blocks until the batch containing X is scored
+        self._ensure_started()
+        pending = _Pending(model, X, backend)
+        with metrics.stage("microbatch_wait"):
+            self._queue.put(pending)
+            pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _run(self):
+        # Stages timed on this thread score requests from every endpoint at once
+        metrics.set_endpoint("microbatch")
+        while True:
+            batch = [self._queue.get()]
+            rows = len(batch[0].X)
+            deadline = time.monotonic() + self.max_wait
+            while rows < self.max_rows:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    pending = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                batch.append(pending)
+                rows += len(pending.X)
+
+            # Requests that snapshotted different models (a reload landed mid-window) or
+            # asked for different backends are scored separately
+            groups = {}
+            for pending in batch:
+                groups.setdefault((id(pending.model), pending.backend), []).append(pending)
+            for group in groups.values():
+                self._score(group)
+
+    def _score(self, group):
+        try:
+            X = np.vstack([pending.X for pending in group])
+            if metrics.ENABLED:
+                BATCH_ROWS.observe(len(X))
+            scores, passfail_idx = group[0].model.predict_matrix(X, group[0].backend)
+        except Exception as e:
+            for pending in group:
+                pending.error = e
+                pending.done.set()
+            return
+
+        start = 0
+        for pending in group:
+            end = start + len(pending.X)
+            pending.result = (scores[start:end], passfail_idx[start:end])
+            pending.done.set()
+            start = end
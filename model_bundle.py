@@ -0,0 +1,92 @@
+# model_bundle.py
+# Bundle layout and I/O. Kept free of pandas and sklearn so the serving process can load a
+# bundle and answer from the flat forests without importing either (see Deferred below).
+import os
+import pickle
+import tempfile
+import threading
+
+import joblib
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Bump when the bundle layout changes so old artifacts are rejected instead of misread
+BUNDLE_FORMAT = 3
+DEFAULT_MODEL_PATH = os.path.join(BASE_DIR, "model", "student_model.pkl")
+
+FEATURE_COLUMNS = ['Gender', 'Study_Hours_per_Week', 'Attendance_Rate', 'Past_Exam_Scores',
+                   'Parental_Education_Level', 'Internet_Access_at_Home', 'Extracurricular_Activities']
+CATEGORICAL_COLUMNS = ['Gender', 'Parental_Education_Level',
+                       'Internet_Access_at_Home', 'Extracurricular_Activities']
+NUMERIC_COLUMNS = [col for col in FEATURE_COLUMNS if col not in CATEGORICAL_COLUMNS]
+TARGET_COLUMNS = ['Final_Exam_Score', 'Pass_Fail']
+# Columns with a LabelEncoder in the bundle
+LABEL_COLUMNS = CATEGORICAL_COLUMNS + ['Pass_Fail']
+
+
+class Deferred:
+    # Holds a value that is pickled as an opaque blob inside the bundle and only unpickled
+    # (importing whatever it needs, e.g. sklearn) on the first get(). Used for the sklearn
+    # encoders and forests, which inference only needs for the sklearn backend.
+    # The blob is a uint8 array rather than bytes so load_bundle's mmap_mode maps it from
+    # the page cache instead of reading a private copy into every process; it is dropped
+    # once unpickled.
+
+    def __init__(self, value):
+        self._value = value
+        self._blob = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        if self._value is None:
+            return {"blob": self._blob}
+        return {"blob": np.frombuffer(pickle.dumps(self._value, protocol=5), dtype=np.uint8)}
+
+    def __setstate__(self, state):
+        self._value = None
+        self._blob = state["blob"]
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._value is not None
+
+    def get(self):
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = pickle.loads(self._blob)
+                    self._blob = None
+        return self._value
+
+
+def save_bundle(bundle, path=DEFAULT_MODEL_PATH):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # Write to a temp file first so a running server never sees a half-written artifact;
+    # a unique name per writer, so concurrent saves cannot interleave in one file.
+    # Left uncompressed so load_bundle can memory-map the NumPy arrays.
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp",
+                                    dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            joblib.dump(bundle, f)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+
+def load_bundle(path=DEFAULT_MODEL_PATH, mmap_mode=None):
+    # mmap_mode="r" maps the flat forests' and lookup table's arrays read-only from the page
+    # cache, so every process loading the same file shares them, including the sklearn
+    # objects' pickled blob until bundle["sklearn"].get(); unpickled in the gunicorn master
+    # (preload), they are shared copy-on-write too.
+    bundle = joblib.load(path, mmap_mode=mmap_mode)
+    if not isinstance(bundle, dict) or bundle.get("format") != BUNDLE_FORMAT:
+        raise ValueError(f"{path} is not a format-{BUNDLE_FORMAT} model bundle; re-run model_training.py")
+    if bundle["feature_columns"] != FEATURE_COLUMNS:
+        raise ValueError(f"{path} was trained on different features: {bundle['feature_columns']}")
+    return bundle
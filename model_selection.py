@@ -0,0 +1,282 @@
+# model_selection.py
+import argparse
+import itertools
+import json
+import math
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+
+from feature_store import DEFAULT_CACHE_DIR, FeatureStore
+from model_training import DEFAULT_CHUNKSIZE, find_data_path, load_training_frame, encode_training_frame
+
+# The families the home page describes, each with a hyperparameter grid for the score model.
+# Gradient boosting uses sklearn's histogram implementation rather than XGBoost, which is
+# not a dependency.
+FAMILIES = {
+    "random_forest": {"n_estimators": [25, 50, 100], "max_depth": [None, 12, 8], "min_samples_leaf": [1, 5]},
+    "linear_regression": {"fit_intercept": [True]},
+    "gradient_boosting": {"learning_rate": [0.05, 0.1], "max_iter": [100, 300], "max_leaf_nodes": [15, 31]},
+    "decision_tree": {"max_depth": [None, 12, 8, 5], "min_samples_leaf": [1, 5, 20]},
+}
+
+
+def make_estimator(family, params):
+    # Built inside the workers; one thread each, the parallelism is across fits
+    if family == "random_forest":
+        from sklearn.ensemble import RandomForestRegressor
+        return RandomForestRegressor(random_state=42, n_jobs=1, **params)
+    if family == "linear_regression":
+        from sklearn.linear_model import LinearRegression
+        return LinearRegression(**params)
+    if family == "gradient_boosting":
+        from sklearn.ensemble import HistGradientBoostingRegressor
+        return HistGradientBoostingRegressor(random_state=42, early_stopping=False, **params)
+    if family == "decision_tree":
+        from sklearn.tree import DecisionTreeRegressor
+        return DecisionTreeRegressor(random_state=42, **params)
+    raise ValueError(f"Unknown model family {family!r}; expected one of {sorted(FAMILIES)}")
+
+
+def candidates(families):
+    return [{"family": family, "params": dict(zip(FAMILIES[family], values))}
+            for family in families for values in itertools.product(*FAMILIES[family].values())]
+
+
+def halving_rounds(n_rows, n_candidates, factor, min_rows):
+    # Rows per round, growing by `factor` up to all rows, with enough rounds for the field to
+    # shrink to one candidate unless the first round would drop below min_rows
+    n_rounds = 1 + math.ceil(math.log(max(n_candidates, 1), factor))
+    while n_rounds > 1 and n_rows // factor ** (n_rounds - 1) < min_rows:
+        n_rounds -= 1
+    return [n_rows // factor ** (n_rounds - 1 - r) for r in range(n_rounds)]
+
+
+# -----------------------------------------
+# WORKERS
+# -----------------------------------------
+def fold_rows(n_total, n_rows, n_folds, fold, seed):
+    # Recomputed in every worker from a few integers, so tasks never carry index arrays
+    rows = np.random.default_rng(seed).permutation(n_total)[:n_rows]
+    test = np.zeros(n_rows, dtype=bool)
+    test[fold::n_folds] = True
+    return np.sort(rows[~test]), np.sort(rows[test])
+
+
+def load_data(data_dir):
+    # X and y are memory-mapped from the .npy files the parent wrote once, so every worker
+    # reads the same pages from the OS cache instead of receiving a pickled copy
+    return (np.load(os.path.join(data_dir, "X.npy"), mmap_mode="r"),
+            np.load(os.path.join(data_dir, "y.npy"), mmap_mode="r"))
+
+
+def measure_model(candidate, model, X_test):
+    # Inference cost and size. Random forests are timed the way the app serves small
+    # requests, on their flat export (flat_forest.py).
+    X_test = np.ascontiguousarray(X_test)
+    predict = model.predict
+    if candidate["family"] == "random_forest":
+        from flat_forest import FlatForest
+        predict = FlatForest.from_sklearn(model).compact().predict_regression
+    samples = []
+    for i in range(min(200, len(X_test))):
+        start = time.perf_counter()
+        predict(X_test[i:i + 1])
+        samples.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    model.predict(X_test)
+    return {
+        "single_row_us": round(float(np.median(samples)) * 1e6, 1),
+        "batch_rows_per_sec": round(len(X_test) / (time.perf_counter() - start)),
+        "size_mb": round(len(pickle.dumps(model, protocol=5)) / 1e6, 3),
+    }
+
+
+def evaluate_fold(data_dir, candidate, n_rows, n_folds, fold, seed, measure):
+    X, y = load_data(data_dir)
+    train, test = fold_rows(len(X), n_rows, n_folds, fold, seed)
+    model = make_estimator(candidate["family"], candidate["params"])
+
+    start = time.perf_counter()
+    model.fit(X[train], y[train])
+    fit_seconds = time.perf_counter() - start
+    error = model.predict(X[test]) - y[test]
+    result = {
+        "rmse": float(np.sqrt(np.mean(error ** 2))),
+        "mae": float(np.mean(np.abs(error))),
+        "r2": float(1 - np.sum(error ** 2) / np.sum((y[test] - y[test].mean()) ** 2)),
+        "fit_seconds": fit_seconds,
+    }
+    if measure:
+        # Once per candidate and round (fold 0); timed while other fits share the cores,
+        # so only a rough figure until measure_serially replaces it
+        result.update(measure_model(candidate, model, X[test]))
+    return result
+
+
+def measure_serially(data_dir, row, n_folds, seed):
+    # Refits the candidate on fold 0 of the last round it reached and times it in this
+    # process with nothing else running
+    X, y = load_data(data_dir)
+    train, test = fold_rows(len(X), row["rows"], n_folds, 0, seed)
+    model = make_estimator(row["family"], row["params"])
+    model.fit(X[train], y[train])
+    return measure_model(row, model, X[test])
+
+
+# -----------------------------------------
+# SUCCESSIVE HALVING
+# -----------------------------------------
+def successive_halving(data_dir, n_total, pool, field, n_folds, factor, min_rows, seed):
+    # Every candidate is cross-validated on a small sample; the best 1/factor move on to a
+    # sample `factor` times larger, until the survivors are scored on all rows. Returns one
+    # row per candidate with the mean fold metrics of the last round it reached.
+    report = [None] * len(field)
+    alive = list(range(len(field)))
+    rounds = halving_rounds(n_total, len(field), factor, min_rows)
+    for r, n_rows in enumerate(rounds):
+        print(f"▶ round {r + 1}/{len(rounds)}: {len(alive)} candidates x {n_folds} folds on {n_rows:,} rows",
+              file=sys.stderr)
+        tasks = [(i, fold) for i in alive for fold in range(n_folds)]
+        results = pool(delayed(evaluate_fold)(data_dir, field[i], n_rows, n_folds, fold, seed, fold == 0)
+                       for i, fold in tasks)
+        folds = {i: [] for i in alive}
+        for (i, _), result in zip(tasks, results):
+            folds[i].append(result)
+        for i, scores in folds.items():
+            report[i] = {
+                **field[i], "round": r + 1, "rows": n_rows,
+                **{key: round(float(np.mean([f[key] for f in scores])), 4)
+                   for key in ("rmse", "mae", "r2", "fit_seconds")},
+                "rmse_std": round(float(np.std([f["rmse"] for f in scores])), 4),
+                **{key: scores[0][key] for key in ("single_row_us", "batch_rows_per_sec", "size_mb")},
+                "latency": "parallel",
+            }
+        if r < len(rounds) - 1:
+            alive = sorted(alive, key=lambda i: report[i]["rmse"])[:max(1, math.ceil(len(alive) / factor))]
+    # Furthest round first, then by error within it
+    return sorted(report, key=lambda row: (-row["round"], row["rmse"]))
+
+
+def finalists(report):
+    # The candidates a recommendation is likely to come from: every one that reached the
+    # last round, plus the best of each family
+    best_of_family = {}
+    for row in report:
+        best_of_family.setdefault(row["family"], row)
+    return [row for row in report if row["round"] == report[0]["round"] or row in best_of_family.values()]
+
+
+def recommend(report, latency_budget_us, family=None):
+    # Lowest error among the candidates that meet the budget, preferring those that reached
+    # a later round (and so were scored on more rows); optionally within one family
+    fitting = [row for row in report if (family is None or row["family"] == family)
+               and (not latency_budget_us or row["single_row_us"] <= latency_budget_us)]
+    return fitting[0] if fitting else None
+
+
+def train_command(row):
+    # Only random forests are served (flat_forest.py); see model_training.py for the flags
+    if row["family"] != "random_forest":
+        return None
+    params = row["params"]
+    parts = ["python model_training.py", f"--n-estimators {params['n_estimators']}"]
+    if params["max_depth"] is not None:
+        parts.append(f"--max-depth {params['max_depth']}")
+    if params["min_samples_leaf"] != 1:
+        parts.append(f"--min-samples-leaf {params['min_samples_leaf']}")
+    return " ".join(parts)
+
+
+def print_table(report):
+    columns = ["round", "rows", "rmse", "mae", "r2", "fit_seconds", "single_row_us", "batch_rows_per_sec", "size_mb",
+               "latency"]
+    print(f"{'candidate':<60}" + "".join(f"{col:>14}" for col in columns))
+    for row in report:
+        name = row["family"] + " " + ",".join(f"{k}={v}" for k, v in row["params"].items())
+        print(f"{name:<60}" + "".join(f"{str(row[col]):>14}" for col in columns))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Cross-validate the candidate model families for the score model with successive halving.")
+    parser.add_argument("--data", default=None, help="training CSV (defaults to the first sample.csv found)")
+    parser.add_argument("--families", default=",".join(FAMILIES), help="comma-separated subset of " + ", ".join(FAMILIES))
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--factor", type=int, default=3, help="keep the best 1/factor per round; rows grow by factor")
+    parser.add_argument("--min-rows", type=int, default=1000, help="smallest sample a first round may use")
+    parser.add_argument("--latency-budget-us", type=float, default=0,
+                        help="recommend the best candidate whose single-row predict fits this budget")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="parallel fits (-1 = all cores)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--feature-cache", default=DEFAULT_CACHE_DIR, help="as in model_training.py ('off' to disable)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    csv_path = args.data or find_data_path()
+    if not csv_path:
+        raise SystemExit("❌ ERROR: no training data found")
+    families = [family.strip() for family in args.families.split(",") if family.strip()]
+    unknown = set(families) - set(FAMILIES)
+    if unknown:
+        parser.error(f"unknown families {sorted(unknown)}; expected some of {list(FAMILIES)}")
+    if args.folds < 2:
+        parser.error("--folds must be at least 2")
+
+    store = None if args.feature_cache == "off" else FeatureStore(args.feature_cache)
+    _, X, y_score, _ = encode_training_frame(load_training_frame(csv_path, args.chunksize, store))
+    field = candidates(families)
+    data_dir = tempfile.mkdtemp(prefix="edupredict-selection-")
+    try:
+        np.save(os.path.join(data_dir, "X.npy"), X)
+        np.save(os.path.join(data_dir, "y.npy"), y_score.astype(np.float64))
+        n_total = len(X)
+        del X, y_score
+        start = time.perf_counter()
+        with Parallel(n_jobs=args.n_jobs) as pool:
+            report = successive_halving(data_dir, n_total, pool, field, args.folds, args.factor,
+                                        args.min_rows, args.seed)
+        # The workers' latencies were taken while other fits competed for the cores
+        finals = finalists(report)
+        print(f"▶ timing {len(finals)} finalists serially", file=sys.stderr)
+        for row in finals:
+            row.update(measure_serially(data_dir, row, args.folds, args.seed), latency="serial")
+        seconds = time.perf_counter() - start
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    for row in report:
+        row["train_command"] = train_command(row)
+    print_table(report)
+    print(f"{len(field)} candidates in {seconds:.1f}s")
+    best = servable = recommend(report, args.latency_budget_us)
+    picks = [("Best", best)]
+    if best is not None and not best["train_command"]:
+        servable = recommend(report, args.latency_budget_us, "random_forest")
+        picks.append(("Best servable", servable))
+    budget = f" within {args.latency_budget_us:g} µs/row" if args.latency_budget_us else ""
+    for label, row in picks:
+        if row is None:
+            print(f"{label}: no candidate{budget}")
+            continue
+        print(f"{label}{budget}: {row['family']} {row['params']} "
+              f"(RMSE {row['rmse']} on {row['rows']:,} rows, {row['single_row_us']} µs/row, {row['size_mb']} MB)")
+        if row["train_command"]:
+            print(f"  {row['train_command']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"data": csv_path, "rows": n_total, "folds": args.folds, "factor": args.factor,
+                       "seconds": round(seconds, 1), "latency_budget_us": args.latency_budget_us,
+                       "recommended": best, "recommended_servable": servable, "candidates": report}, f, indent=2)
+        print(f"Saved model selection report to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
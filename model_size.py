@@ -0,0 +1,159 @@
+# model_size.py
+import argparse
+import copy
+import itertools
+import json
+import pickle
+import sys
+import time
+
+import numpy as np
+
+from feature_store import DEFAULT_CACHE_DIR, FeatureStore
+from flat_forest import FlatForest, PRECISIONS
+from model_training import (DEFAULT_CHUNKSIZE, find_data_path, load_training_frame, encode_training_frame,
+                            make_models, fit_models, select_trees)
+
+
+def parse_list(spec, cast):
+    return [None if item.strip().lower() == "none" else cast(item) for item in spec.split(",")]
+
+
+def split_rows(n_rows, holdout, seed):
+    # Holdout rows score every variant; 10% of the rest choose trees for --keep-trees.
+    # Every variant is fitted on the same remaining rows so the comparison is fair.
+    rng = np.random.default_rng(seed)
+    draw = rng.random(n_rows)
+    hold = draw < holdout
+    val = ~hold & (draw < holdout + (1 - holdout) * 0.1)
+    return ~hold & ~val, val, hold
+
+
+def single_row_us(score_forest, passfail_forest, X, repeats=200):
+    samples = []
+    for i in range(repeats):
+        row = X[i % len(X)][None, :]
+        start = time.perf_counter()
+        score_forest.predict_regression(row)
+        passfail_forest.predict_proba(row)
+        samples.append(time.perf_counter() - start)
+    return round(float(np.median(samples)) * 1e6, 1)
+
+
+def batch_rows_per_sec(score_forest, passfail_forest, X):
+    start = time.perf_counter()
+    score_forest.predict_regression(X)
+    passfail_forest.predict_proba(X)
+    return round(len(X) / (time.perf_counter() - start))
+
+
+def evaluate(score_forest, passfail_forest, X, y_score, y_passfail, reference):
+    scores = score_forest.predict_regression(X)
+    passfail = passfail_forest.classes.take(passfail_forest.predict_proba(X).argmax(axis=1))
+    result = {
+        "score_mae": round(float(np.abs(scores - y_score).mean()), 4),
+        "score_rmse": round(float(np.sqrt(((scores - y_score) ** 2).mean())), 4),
+        "pass_accuracy": round(float((passfail == y_passfail).mean()), 4),
+    }
+    if reference is not None:
+        # Against the first (baseline) variant: how much serving output would change
+        result["max_score_change"] = round(float(np.abs(scores - reference[0]).max()), 6)
+        result["pass_agreement"] = round(float((passfail == reference[1]).mean()), 4)
+    return result, (scores, passfail)
+
+
+def train_command(variant):
+    parts = ["python model_training.py"]
+    if variant["max_depth"] is not None:
+        parts.append(f"--max-depth {variant['max_depth']}")
+    if variant["min_samples_leaf"] != 1:
+        parts.append(f"--min-samples-leaf {variant['min_samples_leaf']}")
+    if variant["keep_trees"]:
+        parts.append(f"--keep-trees {variant['keep_trees']}")
+    if variant["precision"] != "float64":
+        parts.append(f"--precision {variant['precision']}")
+    return " ".join(parts)
+
+
+def print_table(rows):
+    columns = ["max_depth", "min_samples_leaf", "keep_trees", "precision", "nodes", "flat_mb",
+               "score_mae", "pass_accuracy", "max_score_change", "single_row_us", "batch_rows_per_sec"]
+    print(" ".join(f"{col:>18}" for col in columns))
+    for row in rows:
+        print(" ".join(f"{str(row.get(col, '')):>18}" for col in columns))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Measure accuracy, size and latency of smaller forest variants on a holdout split.")
+    parser.add_argument("--data", default=None, help="training CSV (defaults to the first sample.csv found)")
+    parser.add_argument("--holdout", type=float, default=0.2, help="fraction of rows held out for scoring")
+    parser.add_argument("--n-estimators", type=int, default=50)
+    parser.add_argument("--max-depth", default="none,12,8", help="comma-separated; none = unbounded")
+    parser.add_argument("--min-samples-leaf", default="1,5")
+    parser.add_argument("--keep-trees", default="0,20", help="comma-separated; 0 = keep all trees")
+    parser.add_argument("--precision", default=",".join(PRECISIONS))
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--feature-cache", default=DEFAULT_CACHE_DIR, help="as in model_training.py ('off' to disable)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    csv_path = args.data or find_data_path()
+    if not csv_path:
+        raise SystemExit("❌ ERROR: no training data found")
+    store = None if args.feature_cache == "off" else FeatureStore(args.feature_cache)
+    _, X, y_score, y_passfail = encode_training_frame(load_training_frame(csv_path, args.chunksize, store))
+    fit, val, hold = split_rows(len(X), args.holdout, args.seed)
+    if not hold.any() or not val.any():
+        raise SystemExit("❌ ERROR: not enough rows for a holdout and a validation split")
+    X_hold = X[hold]
+    print(f"{fit.sum():,} rows to fit, {val.sum():,} to select trees, {hold.sum():,} held out",
+          file=sys.stderr)
+
+    precisions = [p for p in parse_list(args.precision, str)]
+    reference, rows = None, []
+    for max_depth, min_leaf in itertools.product(parse_list(args.max_depth, int),
+                                                 parse_list(args.min_samples_leaf, int)):
+        print(f"▶ fitting max_depth={max_depth} min_samples_leaf={min_leaf}", file=sys.stderr)
+        full_models = make_models(args.n_estimators, max_depth, min_leaf)
+        fit_models(*full_models, X[fit], y_score[fit], y_passfail[fit], args.n_jobs)
+
+        for keep in parse_list(args.keep_trees, int):
+            score_model, passfail_model = (copy.copy(model) for model in full_models)
+            if keep:
+                select_trees(score_model, X[val], y_score[val], keep)
+                select_trees(passfail_model, X[val], y_passfail[val], keep)
+            sklearn_bytes = len(pickle.dumps((score_model, passfail_model), protocol=5))
+            exported = (FlatForest.from_sklearn(score_model), FlatForest.from_sklearn(passfail_model))
+
+            for precision in precisions:
+                score_forest, passfail_forest = (forest.compact(precision) for forest in exported)
+                variant = {"max_depth": max_depth, "min_samples_leaf": min_leaf,
+                           "keep_trees": keep, "precision": precision}
+                metrics, outputs = evaluate(score_forest, passfail_forest, X_hold, y_score[hold],
+                                            y_passfail[hold], reference)
+                reference = reference or outputs
+                rows.append({
+                    **variant,
+                    "trees": len(score_forest.roots),
+                    "nodes": score_forest.n_nodes + passfail_forest.n_nodes,
+                    "max_tree_depth": max(score_forest.max_depth, passfail_forest.max_depth),
+                    "flat_mb": round((score_forest.nbytes + passfail_forest.nbytes) / 1e6, 3),
+                    "sklearn_mb": round(sklearn_bytes / 1e6, 3),
+                    **metrics,
+                    "single_row_us": single_row_us(score_forest, passfail_forest, X_hold),
+                    "batch_rows_per_sec": batch_rows_per_sec(score_forest, passfail_forest, X_hold[:10000]),
+                    "train_command": train_command(variant),
+                })
+
+    print_table(rows)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"data": csv_path, "holdout_rows": int(hold.sum()), "variants": rows}, f, indent=2)
+        print(f"Saved model size report to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
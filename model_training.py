@@ -1,23 +1,390 @@
 # model_training.py
-import pandas as pd
-from sklearn.linear_model import LinearRegression
-import joblib
+import argparse
 import os
+import resource
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
+from sklearn.preprocessing import LabelEncoder
+
+from feature_store import DEFAULT_CACHE_DIR, FeatureStore, file_checksum, read_training_csv
+from flat_forest import FlatForest, PRECISIONS
+from memory_report import peak_rss_kb, process_memory, reset_peak_rss
+from model_bundle import (BASE_DIR, BUNDLE_FORMAT, DEFAULT_MODEL_PATH, FEATURE_COLUMNS, CATEGORICAL_COLUMNS,
+                          TARGET_COLUMNS, LABEL_COLUMNS, Deferred, save_bundle, load_bundle)
+
+# Rows per chunk when reading training CSVs
+DEFAULT_CHUNKSIZE = 250000
+
+possible_paths = [
+    os.path.join(BASE_DIR, "data", "sample.csv"),
+    os.path.join(BASE_DIR, "sample.csv"),
+    "data/sample.csv",
+    "sample.csv"
+]
+
+
+def find_data_path():
+    for path in possible_paths:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def source_checksum(path, store=None):
+    # The feature store remembers checksums of unchanged files instead of re-hashing them
+    return store.checksum(path) if store is not None else file_checksum(path)
+
+
+# -----------------------------------------
+# STAGE REPORTING
+# -----------------------------------------
+class StageTimer:
+    # Wall time and memory per training stage. peak_rss_mb is the highest resident memory
+    # during the stage: the high-water mark is reset when the stage starts, which needs
+    # Linux. Elsewhere only the process-lifetime peak is available and is reported as
+    # process_peak_rss_mb instead. rss_delta_mb is how much resident memory the stage added.
+
+    def __init__(self, verbose=True):
+        self.verbose = verbose
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        rss_before = process_memory().get("rss_kb", 0)
+        per_stage = reset_peak_rss()
+        start = time.perf_counter()
+        yield
+        seconds = time.perf_counter() - start
+        peak = peak_rss_kb() if per_stage else None
+        if peak is None:
+            per_stage = False
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            peak = peak / 1024 if sys.platform == "darwin" else peak
+        entry = {
+            "stage": name,
+            "seconds": round(seconds, 3),
+            "peak_rss_mb" if per_stage else "process_peak_rss_mb": round(peak / 1024, 1),
+            "rss_delta_mb": round((process_memory().get("rss_kb", 0) - rss_before) / 1024, 1),
+        }
+        self.stages.append(entry)
+        if self.verbose:
+            label = "peak" if per_stage else "process peak"
+            print(f"  {name:<16}{entry['seconds']:>9.2f}s   {label} {round(peak / 1024, 1):>8.1f} MB"
+                  f"   +{entry['rss_delta_mb']} MB")
+
+
+# -----------------------------------------
+# DATA LOADING
+# -----------------------------------------
+def load_training_frame(csv_path, chunksize=DEFAULT_CHUNKSIZE, store=None):
+    # With a FeatureStore, a file parsed before is memory-mapped from its columnar cache
+    # instead of being parsed again
+    if store is not None:
+        return store.load(csv_path, chunksize)
+    return read_training_csv(csv_path, chunksize)
+
+
+def encode_training_frame(df, encoders=None):
+    # Returns (encoders, X, y_score, y_passfail). New encoders are fitted unless existing
+    # ones are passed in, in which case unseen labels are an error. Rows with an empty
+    # feature or target cell are dropped (and counted): their category code would be -1,
+    # which the classifier would learn as a class of its own.
+    incomplete = df[FEATURE_COLUMNS + TARGET_COLUMNS].isna().any(axis=1).to_numpy()
+    if incomplete.any():
+        print(f"⚠️ Dropping {int(incomplete.sum())} of {len(df)} training rows with missing values",
+              file=sys.stderr)
+        df = df[~incomplete]
+    if not len(df):
+        raise ValueError("No complete training rows")
+
+    fit = encoders is None
+    encoders = {} if fit else encoders
+    codes = {}
+    for col in LABEL_COLUMNS:
+        if fit:
+            encoders[col] = LabelEncoder().fit(np.asarray(df[col].cat.categories, dtype=object))
+            codes[col] = df[col].cat.codes.to_numpy()
+        else:
+            codes[col] = pd.Categorical(df[col], categories=encoders[col].classes_).codes
+            unseen = set(df[col][codes[col] < 0].unique())
+            if unseen:
+                raise ValueError(f"{col} has values the model was not trained on: {sorted(unseen)}")
+        if (codes[col] < 0).any():
+            raise ValueError(f"{col} has rows without a valid label")
+
+    # Trees split on float32 internally, so build X in float32 and skip a float64 copy
+    X = np.empty((len(df), len(FEATURE_COLUMNS)), dtype=np.float32)
+    for j, col in enumerate(FEATURE_COLUMNS):
+        X[:, j] = codes[col] if col in CATEGORICAL_COLUMNS else df[col].to_numpy()
+    return encoders, X, df['Final_Exam_Score'].to_numpy(), codes['Pass_Fail']
+
+
+# -----------------------------------------
+# TRAINING
+# -----------------------------------------
+def fit_models(score_model, passfail_model, X, y_score, y_passfail, n_jobs=-1):
+    # Fits both forests at the same time, splitting the cores between them. Tree building
+    # releases the GIL, so two threads are enough to keep every core busy.
+    n_cores = os.cpu_count() if n_jobs == -1 else n_jobs
+    score_model.n_jobs = passfail_model.n_jobs = max(1, n_cores // 2)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(score_model.fit, X, y_score),
+                   pool.submit(passfail_model.fit, X, y_passfail)]
+        for future in futures:
+            future.result()
+    # Serve single-threaded: threaded predict costs more than it saves on small requests
+    score_model.n_jobs = passfail_model.n_jobs = None
+
+
+def make_models(n_estimators=50, max_depth=None, min_samples_leaf=1):
+    # Depth and leaf-size caps bound the node count; the inputs are low precision, so
+    # unbounded trees mostly memorize noise below a certain depth
+    params = dict(n_estimators=n_estimators, max_depth=max_depth, min_samples_leaf=min_samples_leaf,
+                  random_state=42)
+    return RandomForestRegressor(**params), RandomForestClassifier(**params)
+
+
+def select_trees(model, X_val, y_val, keep):
+    # Greedy forward selection: repeatedly adds the tree that most lowers the validation
+    # error of the running average (squared error on scores, Brier score on pass/fail),
+    # then drops the rest from the fitted model
+    if keep <= 0 or keep >= len(model.estimators_):
+        return model
+    if hasattr(model, "classes_"):
+        target = (y_val[:, None] == model.classes_[None, :]).astype(np.float64)
+        per_tree = np.stack([tree.predict_proba(X_val) for tree in model.estimators_])
+    else:
+        target = y_val.astype(np.float64)
+        per_tree = np.stack([tree.predict(X_val) for tree in model.estimators_])
+
+    chosen, total = [], np.zeros_like(per_tree[0])
+    remaining = list(range(len(per_tree)))
+    for step in range(1, keep + 1):
+        errors = [np.mean(((total + per_tree[i]) / step - target) ** 2) for i in remaining]
+        best = remaining.pop(int(np.argmin(errors)))
+        chosen.append(best)
+        total += per_tree[best]
+
+    model.estimators_ = [model.estimators_[i] for i in sorted(chosen)]
+    model.n_estimators = keep
+    return model
+
+
+def compute_importances(score_model, passfail_model, X, y_score, y_passfail, source, n_repeats=5,
+                        max_rows=5000, n_jobs=-1):
+    # Global importances stored in the bundle. Impurity importances come with the fitted
+    # forests; permutation importances are the drop in R² (score) and accuracy (pass/fail)
+    # when one feature's column is shuffled, on up to max_rows rows described by `source`.
+    # Rows the forests were fitted on overstate every drop, but rank features much the same.
+    from sklearn.inspection import permutation_importance
+    rows = np.sort(np.random.default_rng(42).permutation(len(X))[:max_rows])
+    result = {"permutation_data": source, "permutation_rows": int(len(rows)), "permutation_repeats": n_repeats}
+    n_cores = os.cpu_count() if n_jobs == -1 else n_jobs
+    for name, model, y, metric in (("score", score_model, y_score, "r2"),
+                                   ("passfail", passfail_model, y_passfail, "accuracy")):
+        entry = {"impurity": dict(zip(FEATURE_COLUMNS, np.round(model.feature_importances_, 6).tolist()))}
+        if n_repeats > 0 and len(rows):
+            model.n_jobs = n_cores
+            try:
+                permuted = permutation_importance(model, X[rows], y[rows], scoring=metric,
+                                                  n_repeats=n_repeats, random_state=42)
+            finally:
+                model.n_jobs = None
+            entry["permutation"] = {
+                "metric": metric,
+                "mean": dict(zip(FEATURE_COLUMNS, np.round(permuted.importances_mean, 6).tolist())),
+                "std": dict(zip(FEATURE_COLUMNS, np.round(permuted.importances_std, 6).tolist())),
+            }
+        result[name] = entry
+    return result
+
+
+def train_bundle(csv_path, lookup_grid=None, n_estimators=50, n_jobs=-1,
+                 chunksize=DEFAULT_CHUNKSIZE, timer=None, max_depth=None, min_samples_leaf=1,
+                 keep_trees=0, precision="float64", store=None, permutation_repeats=5):
+    # keep_trees > 0 holds out 10% of the rows to choose which trees to keep (select_trees),
+    # which then also serve for the permutation importances (compute_importances);
+    # precision sets how the flat forests store leaf values (FlatForest.compact);
+    # store is an optional FeatureStore to read the CSV through
+    timer = timer or StageTimer(verbose=False)
+    with timer.stage("load"):
+        df = load_training_frame(csv_path, chunksize, store)
+    with timer.stage("encode"):
+        encoders, X, y_score, y_passfail = encode_training_frame(df)
+        n_rows = len(X)
+        del df
+
+    score_model, passfail_model = make_models(n_estimators, max_depth, min_samples_leaf)
+    if keep_trees:
+        val_rows = np.random.default_rng(42).random(n_rows) < 0.1
+        X_val, y_score_val, y_passfail_val = X[val_rows], y_score[val_rows], y_passfail[val_rows]
+        X, y_score, y_passfail = X[~val_rows], y_score[~val_rows], y_passfail[~val_rows]
+    with timer.stage("fit"):
+        fit_models(score_model, passfail_model, X, y_score, y_passfail, n_jobs)
+    if keep_trees:
+        with timer.stage("select_trees"):
+            select_trees(score_model, X_val, y_score_val, keep_trees)
+            select_trees(passfail_model, X_val, y_passfail_val, keep_trees)
+    with timer.stage("importances"):
+        if keep_trees:
+            importances = compute_importances(score_model, passfail_model, X_val, y_score_val, y_passfail_val,
+                                              "validation rows", permutation_repeats, n_jobs=n_jobs)
+        else:
+            importances = compute_importances(score_model, passfail_model, X, y_score, y_passfail,
+                                              "training rows", permutation_repeats, n_jobs=n_jobs)
+
+    history = [{"data_path": os.path.abspath(csv_path), "data_checksum": source_checksum(csv_path, store),
+                "n_rows": n_rows, "trees_added": len(score_model.estimators_)}]
+    return build_bundle(encoders, score_model, passfail_model, history, lookup_grid, timer, precision,
+                        importances)
+
+
+def extend_bundle(base, csv_path, add_trees, lookup_grid=None, n_jobs=-1,
+                  chunksize=DEFAULT_CHUNKSIZE, timer=None, store=None, permutation_repeats=5):
+    # Warm start: grows both forests by add_trees trees fitted on the new file only,
+    # keeping the existing trees and encoders instead of refitting from scratch
+    timer = timer or StageTimer(verbose=False)
+    with timer.stage("load"):
+        df = load_training_frame(csv_path, chunksize, store)
+    with timer.stage("encode"):
+        encoders, X, y_score, y_passfail = encode_training_frame(df, base["sklearn"].get()["encoders"])
+        n_rows = len(X)
+        del df
+
+    score_model, passfail_model = (base["sklearn"].get()[key] for key in ("score_model", "passfail_model"))
+    missing = set(passfail_model.classes_) - set(np.unique(y_passfail))
+    if missing:
+        raise ValueError("New data must contain every Pass_Fail class to add trees: missing "
+                         f"{list(encoders['Pass_Fail'].inverse_transform(sorted(missing)))}")
+    for model in (score_model, passfail_model):
+        model.warm_start = True
+        model.n_estimators = len(model.estimators_) + add_trees
+    with timer.stage("fit"):
+        fit_models(score_model, passfail_model, X, y_score, y_passfail, n_jobs)
+    for model in (score_model, passfail_model):
+        model.warm_start = False
+    with timer.stage("importances"):
+        # The new trees have not seen the older data either, so the new file stands in
+        importances = compute_importances(score_model, passfail_model, X, y_score, y_passfail,
+                                          "new rows", permutation_repeats,
+                                          n_jobs=n_jobs)
+
+    history = base.get("data_history", []) + [{"data_path": os.path.abspath(csv_path),
+                                               "data_checksum": source_checksum(csv_path, store),
+                                               "n_rows": n_rows, "trees_added": add_trees}]
+    return build_bundle(encoders, score_model, passfail_model, history, lookup_grid, timer,
+                        base["score_forest"].precision, importances)
+
+
+def build_bundle(encoders, score_model, passfail_model, history, lookup_grid=None, timer=None,
+                 precision="float64", importances=None):
+    timer = timer or StageTimer(verbose=False)
+    with timer.stage("export"):
+        # Flat node arrays for the fast inference path; memory-mapped on load
+        score_forest = FlatForest.from_sklearn(score_model).compact(precision)
+        passfail_forest = FlatForest.from_sklearn(passfail_model).compact(precision)
+
+    lookup = None
+    if lookup_grid is not None:
+        from lookup_table import LookupTable
+        with timer.stage("lookup_table"):
+            lookup = LookupTable.build(score_model, passfail_model, encoders, lookup_grid)
+
+    latest = history[-1]
+    return {
+        "format": BUNDLE_FORMAT,
+        "model_version": f"{time.strftime('%Y%m%d%H%M%S')}-{latest['data_checksum'][:8]}",
+        "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "data_path": latest["data_path"],
+        "data_checksum": latest["data_checksum"],
+        "data_history": history,
+        "n_rows": sum(entry["n_rows"] for entry in history),
+        "feature_columns": list(FEATURE_COLUMNS),
+        # Label order per encoded column, so serving can encode and decode without sklearn
+        "classes": {col: [str(label) for label in encoders[col].classes_] for col in LABEL_COLUMNS},
+        # Only needed for the sklearn backend, incremental training and lookup table builds
+        "sklearn": Deferred({"encoders": encoders, "score_model": score_model,
+                             "passfail_model": passfail_model}),
+        "score_forest": score_forest,
+        "passfail_forest": passfail_forest,
+        # Optional precomputed outputs over the discretized input space (lookup_table.py)
+        "lookup_table": lookup,
+        # Impurity and permutation importances per model (compute_importances)
+        "importances": importances,
+        "training_stages": timer.stages,
+    }
+
 
-# Ensure model directory exists
-os.makedirs("model", exist_ok=True)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the student performance models and save them as a bundle.")
+    parser.add_argument("--data", default=None, help="training CSV (defaults to the first sample.csv found)")
+    parser.add_argument("--output", default=os.environ.get("MODEL_PATH", DEFAULT_MODEL_PATH),
+                        help="where to write the model bundle")
+    parser.add_argument("--n-estimators", type=int, default=50, help="trees per forest")
+    parser.add_argument("--max-depth", type=int, default=None, help="cap tree depth (default: unbounded)")
+    parser.add_argument("--min-samples-leaf", type=int, default=1, help="minimum training rows per leaf")
+    parser.add_argument("--keep-trees", type=int, default=0,
+                        help="keep only the N trees per forest that best fit a 10%% validation split")
+    parser.add_argument("--precision", choices=PRECISIONS, default="float64",
+                        help="leaf value storage in the flat forests (see model_size.py for the tradeoff)")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="cores to train on (-1 = all)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="rows per CSV chunk")
+    parser.add_argument("--feature-cache", default=DEFAULT_CACHE_DIR,
+                        help="columnar cache of parsed CSVs, reused while the file is unchanged ('off' to disable)")
+    parser.add_argument("--permutation-repeats", type=int, default=5,
+                        help="shuffles per feature for the stored permutation importances (0 = skip them)")
+    parser.add_argument("--add-trees", type=int, default=0,
+                        help="grow the bundle at --base by this many trees fitted on --data only")
+    parser.add_argument("--base", default=None, help="bundle to extend with --add-trees (defaults to --output)")
+    parser.add_argument("--lookup-table", action="store_true",
+                        help="also precompute predictions over the input grid for INFERENCE_BACKEND=table")
+    parser.add_argument("--lookup-grid", default="",
+                        help="override numeric grid axes, e.g. Attendance_Rate=50:100:1,Study_Hours_per_Week=0:60:1")
+    args = parser.parse_args()
 
-# Load small training dataset
-df = pd.read_csv("data/sample.csv")  # file: data/sample.csv
-X = df[["StudyHours"]]
-y = df["ExamScore"]
+    csv_path = args.data or find_data_path()
+    if not csv_path:
+        raise SystemExit("❌ ERROR: no training data found")
 
-# Train a simple linear regression model
-model = LinearRegression()
-model.fit(X, y)
+    lookup_grid = None
+    if args.lookup_table:
+        from lookup_table import parse_grid
+        lookup_grid = parse_grid(args.lookup_grid)
 
-# Save the trained model to disk
-model_path = os.path.join("model", "student_model.pkl")
-joblib.dump(model, model_path)
-print(f"Saved model to: {model_path}")
+    store = None if args.feature_cache == "off" else FeatureStore(args.feature_cache)
+    start = time.perf_counter()
+    timer = StageTimer()
+    if args.add_trees:
+        base = load_bundle(args.base or args.output)
+        bundle = extend_bundle(base, csv_path, args.add_trees, lookup_grid, args.n_jobs, args.chunksize, timer,
+                               store, args.permutation_repeats)
+    else:
+        bundle = train_bundle(csv_path, lookup_grid, args.n_estimators, args.n_jobs, args.chunksize, timer,
+                              args.max_depth, args.min_samples_leaf, args.keep_trees, args.precision, store,
+                              args.permutation_repeats)
+    with timer.stage("save"):
+        save_bundle(bundle, args.output)
 
+    n_trees = len(bundle["score_forest"].roots)
+    print(f"✅ Trained on {bundle['n_rows']} rows from {csv_path} in {time.perf_counter() - start:.2f}s "
+          f"({n_trees} trees per forest)")
+    for name in ("score_forest", "passfail_forest"):
+        forest = bundle[name]
+        print(f"{name}: {forest.n_nodes:,} nodes, {forest.nbytes / 1e6:.2f} MB, "
+              f"max depth {forest.max_depth}, {forest.precision} leaf values")
+    for name in ("score", "passfail"):
+        entry = bundle["importances"][name]
+        ranking = entry["permutation"]["mean"] if "permutation" in entry else entry["impurity"]
+        top = sorted(ranking, key=ranking.get, reverse=True)[:3]
+        print(f"{name} importances: " + ", ".join(f"{col} {ranking[col]:.3f}" for col in top))
+    if bundle["lookup_table"] is not None:
+        stats = bundle["lookup_table"].stats()
+        print(f"Lookup table: {stats['cells']} cells, {stats['bytes'] / 1e6:.1f} MB, "
+              f"max score deviation {stats['max_score_deviation']:.2e}, built in {stats['build_seconds']}s")
+    print(f"Saved model bundle {bundle['model_version']} to: {args.output}")
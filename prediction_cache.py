@@ -0,0 +1,154 @@
+# prediction_cache.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    # In-process LRU cache with an optional TTL (seconds, 0 = never expire).
+
+    def __init__(self, maxsize=10000, ttl=0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, stored_at = entry
+            if self.ttl and time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {"backend": "memory", "size": len(self._data), "maxsize": self.maxsize, "ttl": self.ttl,
+                "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "expirations": self.expirations}
+
+
+class DiskCache:
+    # SQLite-backed cache shared by every process pointing at the same file, e.g. all
+    # gunicorn workers. Counters are per process; size is shared.
+    #
+    # Recency is approximate so that hits stay read-only: used_at is only rewritten when it
+    # is older than touch_interval seconds. The size is checked every evict_every puts (per
+    # process) and the oldest entries are deleted in one batch, so it can run over maxsize
+    # by up to evict_every entries per process in between. SQLite errors (a locked or
+    # unwritable file) count as misses and never fail the request.
+
+    def __init__(self, path, maxsize=100000, ttl=0, touch_interval=60, evict_every=None):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.touch_interval = touch_interval
+        self.evict_every = evict_every or max(1, min(1000, maxsize // 100))
+        self._local = threading.local()
+        self._puts = 0
+        self.hits = self.misses = self.evictions = self.expirations = self.errors = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS cache "
+                         "(key TEXT PRIMARY KEY, value TEXT, stored_at REAL, used_at REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_used_at ON cache (used_at)")
+
+    def _connect(self):
+        # One connection per thread and per process: SQLite handles must not cross a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key):
+        key = repr(key)
+        try:
+            conn = self._connect()
+            row = conn.execute("SELECT value, stored_at, used_at FROM cache WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row is None:
+                self.misses += 1
+                return None
+            if self.ttl and now - row[1] > self.ttl:
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self.expirations += 1
+                self.misses += 1
+                return None
+            if now - row[2] > self.touch_interval:
+                conn.execute("UPDATE cache SET used_at = ? WHERE key = ?", (now, key))
+        except sqlite3.Error:
+            self.errors += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        return tuple(json.loads(row[0]))
+
+    def put(self, key, value):
+        now = time.time()
+        try:
+            conn = self._connect()
+            conn.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)",
+                         (repr(key), json.dumps(value), now, now))
+            self._puts += 1
+            if self._puts % self.evict_every == 0:
+                self._evict(conn)
+        except sqlite3.Error:
+            self.errors += 1
+
+    def _evict(self, conn):
+        # Deletes enough of the least recently used entries to leave room for the next batch
+        overflow = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.maxsize
+        if overflow > 0:
+            overflow += self.evict_every
+            conn.execute("DELETE FROM cache WHERE key IN "
+                         "(SELECT key FROM cache ORDER BY used_at LIMIT ?)", (overflow,))
+            self.evictions += overflow
+
+    def clear(self):
+        self._connect().execute("DELETE FROM cache")
+
+    def stats(self):
+        try:
+            size = self._connect().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        except sqlite3.Error:
+            self.errors += 1
+            size = None
+        return {"backend": "disk", "path": self.path, "size": size, "maxsize": self.maxsize, "ttl": self.ttl,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "expirations": self.expirations, "errors": self.errors}
+
+
+def make_cache(backend, maxsize, ttl=0, path=None):
+    if backend == "memory":
+        return LRUCache(maxsize, ttl)
+    if backend == "disk":
+        return DiskCache(path, maxsize, ttl)
+    if backend == "off":
+        return None
+    raise ValueError(f"Unknown prediction cache backend: {backend}")
@@ -0,0 +1,198 @@
+# prediction_log.py
+import atexit
+import gzip
+import json
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+
+import metrics
+
+RECORDS = metrics.register(metrics.Counter(
+    "edupredict_prediction_log_records_total", "Prediction log records by outcome.", ("outcome",)))
+
+
+def pid_alive(pid):
+    if os.name != "posix":
+        # No harmless liveness check (os.kill terminates on Windows); assume it is running
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class PredictionLog:
+    # Appends one JSON line per prediction without blocking the request thread. Requests
+    # hand entries to an in-memory queue; a background thread serializes them, writes in
+    # batches and rotates the file by size and/or age. The queue is bounded by rows, not
+    # entries, since one batch request enqueues a single entry for all of its rows: an entry
+    # that would take it past queue_size rows is dropped and counted rather than making the
+    # request wait.
+    #
+    # Each process writes its own file, <stem>-<pid>.jsonl, so gunicorn workers never
+    # interleave lines or race on rotation. Rotated files get a timestamp suffix and are
+    # gzipped when compress=True. A process rotates its file when it closes the log, and
+    # the writer thread rotates files left behind by processes that died without closing.
+
+    def __init__(self, path, max_bytes=64 << 20, max_age=3600.0, compress=True,
+                 queue_size=100000, flush_interval=1.0, batch_size=1000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compress = compress
+        self.queue_size = queue_size
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.written = self.dropped = self.rotations = 0
+        self._queued_rows = 0
+        self._queued_lock = threading.Lock()
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        # Like MicroBatcher: the queue and writer thread belong to the current process
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._queued_rows = 0
+                self._file = None
+                self._stop = threading.Event()
+                self._thread = threading.Thread(target=self._run, name="prediction-log", daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+                atexit.register(self.close)
+
+    @property
+    def current_path(self):
+        stem, ext = os.path.splitext(self.path)
+        return f"{stem}-{os.getpid()}{ext}"
+
+    def log(self, record):
+        self.log_many((record,), 1)
+
+    def log_many(self, records, count):
+        # records may be a generator: it is only iterated on the writer thread, so building
+        # the log lines for a large batch costs the request nothing
+        self._ensure_started()
+        with self._queued_lock:
+            accepted = self._queued_rows + count <= self.queue_size
+            if accepted:
+                self._queued_rows += count
+        if accepted:
+            self._queue.put_nowait((records, count))
+        else:
+            self.dropped += count
+            if metrics.ENABLED:
+                RECORDS.inc("dropped", amount=count)
+
+    # -----------------------------------------
+    # WRITER THREAD
+    # -----------------------------------------
+    def _run(self):
+        try:
+            self._rotate_stale()
+        except Exception as e:
+            print(f"❌ ERROR rotating old prediction logs: {e}")
+        while not self._stop.is_set() or not self._queue.empty():
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                self._maybe_rotate()
+                continue
+            rows = batch[0][1]
+            while rows < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+                rows += batch[-1][1]
+            try:
+                self._write(batch)
+                self._maybe_rotate()
+            except Exception as e:
+                print(f"❌ ERROR writing prediction log: {e}")
+            finally:
+                with self._queued_lock:
+                    self._queued_rows -= rows
+
+    def _write(self, batch):
+        if self._file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._file = open(self.current_path, "a", encoding="utf-8")
+            self._opened_at = time.monotonic()
+        lines = [json.dumps(record, separators=(",", ":"), default=str)
+                 for records, _ in batch for record in records]
+        self._file.write("\n".join(lines) + "\n")
+        self._file.flush()
+        self.written += len(lines)
+        if metrics.ENABLED:
+            RECORDS.inc("written", amount=len(lines))
+
+    def _maybe_rotate(self):
+        if self._file is None:
+            return
+        too_big = self.max_bytes and self._file.tell() >= self.max_bytes
+        too_old = self.max_age and time.monotonic() - self._opened_at >= self.max_age
+        if not (too_big or too_old):
+            return
+        self._file.close()
+        self._file = None
+        self._rotate(self.current_path)
+
+    def _rotate(self, path):
+        stem, ext = os.path.splitext(path)
+        rotated = f"{stem}-{time.strftime('%Y%m%d-%H%M%S')}-{self.rotations}{ext}"
+        os.replace(path, rotated)
+        if self.compress:
+            with open(rotated, "rb") as src, gzip.open(rotated + ".gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(rotated)
+        self.rotations += 1
+
+    def _rotate_stale(self):
+        # <stem>-<pid><ext> files of processes that no longer exist are never written or
+        # rotated again; another process sweeping the same file at once just loses the rename
+        directory = os.path.dirname(os.path.abspath(self.path))
+        stem, ext = os.path.splitext(os.path.basename(self.path))
+        pattern = re.compile(re.escape(stem) + r"-(\d+)" + re.escape(ext))
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            match = pattern.fullmatch(name)
+            if match and int(match.group(1)) != os.getpid() and not pid_alive(int(match.group(1))):
+                try:
+                    self._rotate(os.path.join(directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def close(self, timeout=5.0):
+        # Drains what is queued (up to timeout), closes the file and rotates it, since a
+        # file named after this pid would otherwise never be rotated; called at exit
+        if self._pid != os.getpid():
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            if not self._thread.is_alive():
+                try:
+                    self._rotate(self.current_path)
+                except OSError as e:
+                    print(f"❌ ERROR rotating prediction log: {e}")
+
+    def stats(self):
+        depth = self._queued_rows if self._pid == os.getpid() else 0
+        return {"path": self.current_path, "written": self.written, "dropped": self.dropped,
+                "queued": depth, "rotations": self.rotations}
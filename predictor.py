@@ -0,0 +1,339 @@
+# predictor.py
+import threading
+
+import numpy as np
+
+import metrics
+import wire_format
+from flat_forest import ForestGroup
+from model_bundle import FEATURE_COLUMNS, CATEGORICAL_COLUMNS, load_bundle
+
+# Accepted range for each numeric input (inclusive)
+NUMERIC_RANGES = {
+    "Study_Hours_per_Week": (0, 168),
+    "Attendance_Rate": (0, 100),
+    "Past_Exam_Scores": (0, 100),
+}
+
+
+def normalize_label(value):
+    return value.strip().casefold()
+
+
+def to_float(value):
+    # float(value), or NaN for anything that is not a number in float range
+    try:
+        return float(value)
+    except (TypeError, ValueError, OverflowError):
+        return np.nan
+
+
+class FeatureEncoder:
+    # The bundle's label classes compiled into plain dicts once at load time, plus the
+    # input schema. Encoding a request is then a few dict lookups instead of a
+    # LabelEncoder.transform (array allocation, validation, searchsorted) per field.
+
+    def __init__(self, classes, normalize=True):
+        self.labels = {col: classes[col] for col in CATEGORICAL_COLUMNS}
+        self.codes = {col: {label: float(i) for i, label in enumerate(classes[col])}
+                      for col in CATEGORICAL_COLUMNS}
+        self.normalized = {}
+        if normalize:
+            for col, codes in self.codes.items():
+                folded = {normalize_label(label): code for label, code in codes.items()}
+                # Only normalize when it cannot make two classes collide
+                if len(folded) == len(codes):
+                    self.normalized[col] = folded
+
+    def decode_row(self, row):
+        # Inverse of encode_row for a valid row: {column: label or number}
+        return {col: self.labels[col][int(value)] if col in self.labels else float(value)
+                for col, value in zip(FEATURE_COLUMNS, row)}
+
+    def encode_category(self, col, value):
+        if not isinstance(value, str):
+            return None
+        code = self.codes[col].get(value)
+        if code is None and col in self.normalized:
+            code = self.normalized[col].get(normalize_label(value))
+        return code
+
+    def encode_row(self, data):
+        # Returns (feature row in FEATURE_COLUMNS order, []) or (None, [{"field", "error"}, ...])
+        if not isinstance(data, dict):
+            return None, [{"field": None, "error": "Expected a JSON object"}]
+
+        row, errors = [], []
+        for col in FEATURE_COLUMNS:
+            value = data.get(col)
+            if value is None:
+                errors.append({"field": col, "error": "missing"})
+            elif col in self.codes:
+                code = self.encode_category(col, value)
+                if code is None:
+                    errors.append({"field": col, "error": f"unknown value {value!r}; "
+                                   f"expected one of {sorted(self.codes[col])}"})
+                row.append(code)
+            else:
+                number = self.parse_number(col, value, errors)
+                row.append(number)
+        return (None, errors) if errors else (row, errors)
+
+    @staticmethod
+    def parse_number(col, value, errors):
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            errors.append({"field": col, "error": f"expected a number, got {value!r}"})
+            return None
+        low, high = NUMERIC_RANGES[col]
+        try:
+            number = float(value)
+        except OverflowError:
+            # An integer literal too large for a float is still a number, just out of range
+            number = float("inf")
+        except ValueError:
+            errors.append({"field": col, "error": f"expected a number, got {value!r}"})
+            return None
+        if not low <= number <= high:  # also rejects NaN
+            errors.append({"field": col, "error": f"must be between {low} and {high}"})
+            return None
+        return number
+
+
+class Predictor:
+    # Encodes and scores students with one loaded model bundle. Shared by the Flask
+    # app and the offline scoring tools so every path encodes inputs the same way.
+    #
+    # backend: "flat" walks the exported node arrays, "sklearn" calls the forests' predict,
+    # "auto" uses flat up to flat_max_rows rows, where sklearn's fixed per-call cost dominates.
+    # "table" answers from the precomputed lookup table and falls back to "auto" off the grid.
+    #
+    # The sklearn objects are unpickled (and sklearn imported) on first use unless
+    # lazy_sklearn=False; the flat and table backends never need them.
+
+    def __init__(self, bundle, backend="auto", flat_max_rows=256, normalize_labels=True, lazy_sklearn=True):
+        self.bundle = bundle
+        self.model_version = bundle["model_version"]
+        self.classes = bundle["classes"]
+        self.score_forest = bundle["score_forest"]
+        self.passfail_forest = bundle["passfail_forest"]
+        # Walker for predict_uncertainty, built on first use: it copies both forests' nodes
+        self._forest_group = None
+        self._forest_group_lock = threading.Lock()
+        self.lookup_table = bundle.get("lookup_table")
+        self.feature_encoder = FeatureEncoder(self.classes, normalize_labels)
+        self.passfail_classes = np.asarray(self.classes['Pass_Fail'])
+        self.passfail_codes = {label: i for i, label in enumerate(self.classes['Pass_Fail'])}
+        # Contributions explain the probability of this class (Pass when the labels have it)
+        self.explained_class = "Pass" if "Pass" in self.passfail_codes else self.classes['Pass_Fail'][-1]
+        # Global importances computed at training time (model_training.compute_importances)
+        self.importances = bundle.get("importances")
+        self.schema_id = wire_format.schema_id(self.classes)
+        self.backend = "auto" if backend == "table" and self.lookup_table is None else backend
+        self.flat_max_rows = flat_max_rows
+        if not lazy_sklearn:
+            bundle["sklearn"].get()
+
+    @classmethod
+    def load(cls, path, mmap_mode="r", **kwargs):
+        return cls(load_bundle(path, mmap_mode=mmap_mode), **kwargs)
+
+    @property
+    def forest_group(self):
+        if self._forest_group is None:
+            with self._forest_group_lock:
+                if self._forest_group is None:
+                    self._forest_group = ForestGroup([self.score_forest, self.passfail_forest])
+        return self._forest_group
+
+    @property
+    def encoders(self):
+        return self.bundle["sklearn"].get()["encoders"]
+
+    @property
+    def score_model(self):
+        return self.bundle["sklearn"].get()["score_model"]
+
+    @property
+    def passfail_model(self):
+        return self.bundle["sklearn"].get()["passfail_model"]
+
+    # -----------------------------------------
+    # ENCODING
+    # -----------------------------------------
+    def encode_frame(self, frame, records=None):
+        # Encodes every column in one vectorized pass. Returns the float64 feature matrix
+        # (all rows) and a list of problems per row, in encode_row's [{"field", "error"}]
+        # form; only rows with no problems are valid. Rows the vectorized pass flags are
+        # re-checked with encode_row, so both paths accept and reject the same values.
+        # records, when the frame was built from dicts, are the original rows: they are
+        # re-checked as sent, which keeps e.g. an explicit NaN apart from a missing field.
+        # pandas is imported here, not at module level, so /predict never pays for it
+        import pandas as pd
+        encoder = self.feature_encoder
+        X = np.empty((len(frame), len(FEATURE_COLUMNS)), dtype=np.float64)
+        missing = np.zeros((len(frame), len(FEATURE_COLUMNS)), dtype=bool)
+        flagged = np.zeros(len(frame), dtype=bool)
+        problems = [[] for _ in range(len(frame))]
+
+        for j, col in enumerate(FEATURE_COLUMNS):
+            if col not in frame:
+                missing[:, j] = True
+                continue
+            column = frame[col]
+            missing[:, j] = column.isna().to_numpy()
+            types = column.map(type)
+            if col in CATEGORICAL_COLUMNS:
+                # Same compiled dicts as the single-row path. Non-strings are masked out first:
+                # they are never valid labels, and lists or dicts cannot be looked up at all.
+                labels = column.where(types == str)
+                codes = labels.map(encoder.codes[col])
+                if col in encoder.normalized and codes.isna().any():
+                    folded = labels.dropna().map(normalize_label)
+                    codes = codes.fillna(folded.map(encoder.normalized[col]))
+                values = codes.to_numpy(dtype=np.float64)
+            else:
+                # Booleans would coerce to 0 and 1; parse_number rejects them
+                numbers = column.where(~types.isin((bool, np.bool_)))
+                try:
+                    values = pd.to_numeric(numbers, errors="coerce").to_numpy(dtype=np.float64)
+                except OverflowError:
+                    # Integers beyond float range raise even with errors="coerce"
+                    values = numbers.map(to_float).to_numpy(dtype=np.float64)
+                low, high = NUMERIC_RANGES[col]
+                flagged |= (values < low) | (values > high)
+            flagged |= np.isnan(values)
+            X[:, j] = values
+
+        # Columns absent from the frame leave X unset, so their rows must be flagged too
+        flagged |= missing.any(axis=1)
+        for i in np.flatnonzero(flagged).tolist():
+            if records is not None:
+                record = records[i]
+            else:
+                record = {col: frame[col].iat[i] for j, col in enumerate(FEATURE_COLUMNS) if not missing[i, j]}
+                record = {col: value.item() if isinstance(value, np.generic) else value
+                          for col, value in record.items()}
+            row, row_problems = encoder.encode_row(record)
+            problems[i] = row_problems
+            if row is not None:
+                X[i] = row
+        return X, problems
+
+    def decode_passfail(self, passfail_idx):
+        with metrics.stage("decode"):
+            return self.passfail_classes.take(np.asarray(passfail_idx, dtype=np.intp))
+
+    # -----------------------------------------
+    # INFERENCE
+    # -----------------------------------------
+    def predict_matrix(self, X, backend=None):
+        # Returns (scores, encoded pass/fail labels) for a float64 feature matrix.
+        # The flat and sklearn backends give identical outputs unless the bundle was trained
+        # with a lossy --precision; see flat_forest.py.
+        backend = backend or self.backend
+        if backend == "table" and self.lookup_table is not None:
+            with metrics.stage("lookup_table"):
+                scores, passfail_idx, on_grid = self.lookup_table.lookup(X)
+            if not on_grid.all():
+                off_grid = ~on_grid
+                scores[off_grid], passfail_idx[off_grid] = self.predict_matrix(X[off_grid], "auto")
+            return scores, passfail_idx
+
+        if backend == "auto" or backend == "table":
+            backend = "flat" if len(X) <= self.flat_max_rows else "sklearn"
+
+        if backend == "flat":
+            with metrics.stage("predict_score"):
+                scores = self.score_forest.predict_regression(X)
+            with metrics.stage("predict_passfail"):
+                passfail_proba = self.passfail_forest.predict_proba(X)
+                passfail_idx = self.passfail_forest.classes.take(passfail_proba.argmax(axis=1))
+        elif backend == "sklearn":
+            with metrics.stage("predict_score"):
+                scores = self.score_model.predict(X)
+            with metrics.stage("predict_passfail"):
+                passfail_idx = self.passfail_model.predict(X)
+        else:
+            raise ValueError(f"Unknown inference backend: {backend}")
+        return scores, passfail_idx
+
+    def predict_uncertainty(self, X, interval=0.9, backend=None):
+        # Scores plus how much the trees disagree. Returns (scores, encoded pass/fail labels,
+        # details): details holds each row's score_std and the central `interval` of the
+        # per-tree scores (score_low/score_high), and proba, the pass/fail class probabilities
+        # (one column per label in passfail_classes). The tree spread says how stable the
+        # forest's answer is, not a calibrated prediction interval.
+        #
+        # "flat" gets every tree's leaf from both forests in one traversal (ForestGroup);
+        # "sklearn" calls each score tree's predict plus predict_proba, which wins on large
+        # batches. "auto" and "table" choose between them as predict_matrix does.
+        backend = backend or self.backend
+        if backend == "auto" or backend == "table":
+            backend = "flat" if len(X) <= self.flat_max_rows else "sklearn"
+
+        with metrics.stage("predict_uncertainty"):
+            if backend == "flat":
+                score_leaves, passfail_leaves = self.forest_group.leaf_values(X)
+                tree_scores = self.score_forest.decode(score_leaves[:, :, 0])
+                scores = self.score_forest.mean_of(score_leaves)[:, 0]
+                proba = self.passfail_forest.mean_of(passfail_leaves)
+                proba_classes = self.passfail_forest.classes
+            elif backend == "sklearn":
+                X32 = np.ascontiguousarray(X, dtype=np.float32)
+                tree_scores = np.stack([tree.predict(X32, check_input=False)
+                                        for tree in self.score_model.estimators_])
+                scores = np.add.accumulate(tree_scores, axis=0)[-1] / len(tree_scores)
+                proba = self.passfail_model.predict_proba(X)
+                proba_classes = self.passfail_model.classes_
+            else:
+                raise ValueError(f"Unknown inference backend: {backend}")
+            low, high = np.quantile(tree_scores, [(1 - interval) / 2, (1 + interval) / 2], axis=0)
+            passfail_idx = proba_classes.take(proba.argmax(axis=1))
+
+        full_proba = np.zeros((len(X), len(self.passfail_classes)))
+        full_proba[:, proba_classes] = proba
+        details = {"score_std": tree_scores.std(axis=0), "score_low": low, "score_high": high,
+                   "proba": full_proba}
+        return scores, passfail_idx, details
+
+    def explain(self, X, chunk_rows=4096):
+        # Per-row feature contributions (FlatForest.contributions) to the score and to the
+        # probability of explained_class, from the flat forests whatever the backend. Returns
+        # {"score_bias", "score", "pass_bias", "pass"}; "score"/"pass" are (n_rows, n_features).
+        # Rows are walked chunk_rows at a time to bound the per-level temporaries.
+        code = self.passfail_codes[self.explained_class]
+        column = int(np.flatnonzero(self.passfail_forest.classes == code)[0]) \
+            if code in self.passfail_forest.classes else None
+        score = np.empty((len(X), len(FEATURE_COLUMNS)))
+        passing = np.zeros((len(X), len(FEATURE_COLUMNS)))
+        score_bias = pass_bias = 0.0
+        with metrics.stage("explain"):
+            for start in range(0, len(X), chunk_rows):
+                rows = slice(start, start + chunk_rows)
+                bias, contributions = self.score_forest.contributions(X[rows], [0])
+                score[rows], score_bias = contributions[:, :, 0], float(bias[0])
+                if column is not None:
+                    bias, contributions = self.passfail_forest.contributions(X[rows], [column])
+                    passing[rows], pass_bias = contributions[:, :, 0], float(bias[0])
+        return {"score_bias": score_bias, "score": score, "pass_bias": pass_bias, "pass": passing}
+
+    def score_frame(self, frame, backend=None):
+        # Scores a DataFrame with the sample.csv columns. Returns a frame with
+        # Final_Exam_Score, Pass_Fail and error, one row per input row in the same order.
+        import pandas as pd
+        X, problems = self.encode_frame(frame)
+        valid = np.array([not p for p in problems], dtype=bool)
+
+        out = pd.DataFrame(index=frame.index)
+        if "Student_ID" in frame:
+            out["Student_ID"] = frame["Student_ID"]
+        out["Final_Exam_Score"] = np.nan
+        out["Pass_Fail"] = None
+        out["error"] = ["; ".join(f"{p['field']}: {p['error']}" for p in row) if row else None
+                        for row in problems]
+
+        if valid.any():
+            scores, passfail_idx = self.predict_matrix(X[valid], backend)
+            out.loc[valid, "Final_Exam_Score"] = np.round(scores, 2)
+            out.loc[valid, "Pass_Fail"] = self.decode_passfail(passfail_idx)
+        return out
@@ -0,0 +1,174 @@
+# score_csv.py
+import argparse
+import io
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import pandas as pd
+
+from model_bundle import DEFAULT_MODEL_PATH, CATEGORICAL_COLUMNS
+from predictor import Predictor
+
+
+class ResultWriter:
+    # Appends scored chunks to a CSV or Parquet file without holding earlier chunks in memory
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path.endswith(".parquet")
+        self._writer = None
+        self._file = None
+        if self.parquet:
+            # pyarrow is only needed for Parquet output
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                raise SystemExit("❌ ERROR: Parquet output needs pyarrow (pip install pyarrow)")
+            self._pa = pyarrow
+
+    def write(self, frame):
+        if self.parquet:
+            pa = self._pa
+            if self._writer is None:
+                # An all-valid first chunk has no error strings to infer a type from
+                schema = pa.Table.from_pandas(frame, preserve_index=False).schema
+                schema = pa.schema([pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f
+                                    for f in schema])
+                self._writer = pa.parquet.ParquetWriter(self.path, schema)
+            table = pa.Table.from_pandas(frame, schema=self._writer.schema, preserve_index=False)
+            self._writer.write_table(table)
+        else:
+            header = self._file is None
+            if header:
+                self._file = open(self.path, "w", newline="")
+            frame.to_csv(self._file, header=header, index=False)
+
+    def write_csv_text(self, text):
+        # Pre-formatted CSV from a worker process; keep its header only for the first shard
+        if self._file is None:
+            self._file = open(self.path, "w", newline="")
+        else:
+            text = text[text.index("\n") + 1:]
+        self._file.write(text)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+
+
+def iter_chunks(path, chunksize):
+    # Categoricals stay strings so "Yes"/"No" are never reinterpreted by the CSV parser
+    dtypes = {col: str for col in CATEGORICAL_COLUMNS}
+    return pd.read_csv(path, chunksize=chunksize, dtype=dtypes)
+
+
+def iter_text_shards(path, chunksize):
+    # Raw CSV text (header + up to chunksize lines) per shard, so parsing happens in the
+    # workers too. Assumes no quoted newlines, which the sample.csv schema never has.
+    with open(path, newline="") as f:
+        header = f.readline()
+        while True:
+            lines = list(islice(f, chunksize))
+            if not lines:
+                return
+            yield header + "".join(lines)
+
+
+# -----------------------------------------
+# WORKER PROCESSES
+# -----------------------------------------
+_worker_predictor = None
+
+
+def _init_worker(model_path, backend):
+    # Runs once per worker process, so the bundle is loaded (memory-mapped) once, not per shard
+    global _worker_predictor
+    _worker_predictor = Predictor.load(model_path, backend=backend)
+
+
+def _score_shard(text, as_csv):
+    chunk = pd.read_csv(io.StringIO(text), dtype={col: str for col in CATEGORICAL_COLUMNS})
+    scored = _worker_predictor.score_frame(chunk)
+    errors = int(scored["error"].notna().sum())
+    payload = scored.to_csv(index=False) if as_csv else scored
+    return len(scored), errors, payload
+
+
+def score_parallel(input_path, writer, model_path, backend, workers, chunksize, on_progress):
+    # Shards are scored on a process pool and written back strictly in input order.
+    # At most 2 shards per worker are in flight, which keeps memory bounded.
+    as_csv = not writer.parquet
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model_path, backend)) as pool:
+        for text in iter_text_shards(input_path, chunksize):
+            pending.append(pool.submit(_score_shard, text, as_csv))
+            if len(pending) >= 2 * workers:
+                on_progress(*_write_result(writer, pending.popleft().result()))
+        while pending:
+            on_progress(*_write_result(writer, pending.popleft().result()))
+
+
+def _write_result(writer, result):
+    n_rows, n_errors, payload = result
+    if isinstance(payload, str):
+        writer.write_csv_text(payload)
+    else:
+        writer.write(payload)
+    return n_rows, n_errors
+
+
+def report(rows, errors, started, final=False):
+    elapsed = time.perf_counter() - started
+    rate = rows / elapsed if elapsed else 0.0
+    end = "\n" if final else "\r"
+    print(f"{rows:,} rows scored ({errors:,} errors) in {elapsed:.1f}s — {rate:,.0f} rows/sec",
+          end=end, file=sys.stderr, flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV of students in constant memory.")
+    parser.add_argument("input", help="CSV with the sample.csv columns")
+    parser.add_argument("output", help="output .csv or .parquet")
+    parser.add_argument("--model", default=os.environ.get("MODEL_PATH", DEFAULT_MODEL_PATH))
+    parser.add_argument("--chunksize", type=int, default=100000, help="rows per chunk")
+    parser.add_argument("--backend", default="auto", help="auto | flat | sklearn | table")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes (0 = one per CPU); 1 scores in this process")
+    args = parser.parse_args(argv)
+    workers = args.workers or os.cpu_count()
+
+    writer = ResultWriter(args.output)
+    totals = {"rows": 0, "errors": 0}
+    started = time.perf_counter()
+
+    def on_progress(n_rows, n_errors):
+        totals["rows"] += n_rows
+        totals["errors"] += n_errors
+        report(totals["rows"], totals["errors"], started)
+
+    try:
+        if workers > 1:
+            print(f"Scoring with {workers} worker processes", file=sys.stderr)
+            score_parallel(args.input, writer, args.model, args.backend, workers, args.chunksize, on_progress)
+        else:
+            predictor = Predictor.load(args.model, backend=args.backend)
+            print(f"Loaded model bundle {predictor.model_version} from {args.model}", file=sys.stderr)
+            for chunk in iter_chunks(args.input, args.chunksize):
+                scored = predictor.score_frame(chunk)
+                writer.write(scored)
+                on_progress(len(scored), int(scored["error"].notna().sum()))
+    finally:
+        writer.close()
+    report(totals["rows"], totals["errors"], started, final=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# static_page.py
+import gzip
+import hashlib
+from http import HTTPStatus
+
+from werkzeug.http import parse_accept_header, parse_etags, quote_etag
+
+try:
+    import brotli
+except ImportError:
+    # Optional: without it the page is served gzipped or as-is
+    brotli = None
+
+
+class StaticPage:
+    # A page read once and kept in memory together with its compressed variants. Every
+    # variant has its own strong ETag, so a conditional request for the encoding the client
+    # would get anyway is answered with a bodiless 304.
+
+    def __init__(self, body, content_type="text/html; charset=utf-8", max_age=300):
+        self.content_type = content_type
+        self.cache_control = f"public, max-age={max_age}" if max_age > 0 else "no-cache"
+        self.variants = {"identity": body, "gzip": gzip.compress(body, 9, mtime=0)}
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(body, quality=11)
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        self.etags = {encoding: digest if encoding == "identity" else f"{digest}-{encoding}"
+                      for encoding in self.variants}
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        with open(path, "rb") as f:
+            return cls(f.read(), **kwargs)
+
+    def choose_encoding(self, accept_encoding):
+        # Smallest variant the client accepts; brotli beats gzip at equal quality
+        accepted = parse_accept_header(accept_encoding)
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and accepted.quality(encoding) > 0:
+                return encoding
+        return "identity"
+
+    def respond(self, environ):
+        # Returns (status, headers, body) for a GET or HEAD of this page
+        encoding = self.choose_encoding(environ.get("HTTP_ACCEPT_ENCODING", ""))
+        etag = self.etags[encoding]
+        headers = [("ETag", quote_etag(etag)), ("Cache-Control", self.cache_control),
+                   ("Vary", "Accept-Encoding")]
+        if parse_etags(environ.get("HTTP_IF_NONE_MATCH")).contains(etag):
+            return 304, headers, b""
+        body = self.variants[encoding]
+        headers += [("Content-Type", self.content_type), ("Content-Length", str(len(body)))]
+        if encoding != "identity":
+            headers.append(("Content-Encoding", encoding))
+        return 200, headers, body
+
+    def sizes(self):
+        return {encoding: len(body) for encoding, body in self.variants.items()}
+
+
+class StaticPageMiddleware:
+    # Answers GET/HEAD for the given paths before Flask sees the request: no routing,
+    # request context or before/after hooks. Everything else goes to the wrapped app.
+
+    def __init__(self, wsgi_app, pages):
+        self.wsgi_app = wsgi_app
+        self.pages = pages
+
+    def __call__(self, environ, start_response):
+        page = self.pages.get(environ.get("PATH_INFO"))
+        method = environ.get("REQUEST_METHOD")
+        if page is None or method not in ("GET", "HEAD"):
+            return self.wsgi_app(environ, start_response)
+        status, headers, body = page.respond(environ)
+        start_response(f"{status} {HTTPStatus(status).phrase}", headers)
+        return [b"" if method == "HEAD" else body]
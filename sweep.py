@@ -0,0 +1,135 @@
+# sweep.py
+# What-if sweeps: one student with one or two features varied over a grid, scored in a
+# single batched forest call instead of one /predict round trip per value.
+import itertools
+
+import numpy as np
+
+from model_bundle import FEATURE_COLUMNS, CATEGORICAL_COLUMNS
+from predictor import NUMERIC_RANGES, to_float
+
+MAX_AXES = 2
+# Grid points per numeric axis when no step is given
+DEFAULT_POINTS = 21
+
+
+def parse_axes(spec, encoder, max_points):
+    # {"Study_Hours_per_Week": {"min": 0, "max": 40, "step": 1}, "Gender": {"values": [...]}}
+    # -> ([(column, values as sent back, encoded values)], []) or (None, [{"field", "error"}, ...]).
+    # Numeric axes default to the column's accepted range; categorical ones to every label.
+    if not isinstance(spec, dict) or not 1 <= len(spec) <= MAX_AXES:
+        return None, [{"field": "vary", "error": f"expected an object with 1 to {MAX_AXES} features"}]
+
+    axes, errors = [], []
+    for col, options in spec.items():
+        if col not in FEATURE_COLUMNS:
+            errors.append({"field": col, "error": f"not a feature; expected one of {FEATURE_COLUMNS}"})
+            continue
+        options = options if isinstance(options, dict) else {"values": options}
+        if col in CATEGORICAL_COLUMNS:
+            labels = options.get("values", encoder.labels[col])
+            codes = [encoder.encode_category(col, label) for label in labels] if isinstance(labels, list) else [None]
+            if not labels or None in codes:
+                errors.append({"field": col, "error": f"values must be a list of {sorted(encoder.codes[col])}"})
+                continue
+            axes.append((col, [encoder.labels[col][int(code)] for code in codes], np.array(codes)))
+            continue
+
+        axis_errors, values = [], []
+        if "values" in options:
+            raw = options["values"] if isinstance(options["values"], list) else [None]
+            values = [encoder.parse_number(col, value, axis_errors) for value in raw]
+        else:
+            low, high = NUMERIC_RANGES[col]
+            start = encoder.parse_number(col, options.get("min", low), axis_errors)
+            stop = encoder.parse_number(col, options.get("max", high), axis_errors)
+            step = options.get("step")
+            if not axis_errors:
+                if step is None:
+                    step = (stop - start) / (DEFAULT_POINTS - 1) or 1.0
+                # Infinity would turn the grid into NaN rows; integers beyond float range are rejected too
+                if isinstance(step, bool) or not isinstance(step, (int, float)) or not 0 < to_float(step) < np.inf:
+                    axis_errors.append({"field": col, "error": f"step must be a positive finite number, got {step!r}"})
+                elif stop < start:
+                    axis_errors.append({"field": col, "error": "max must not be below min"})
+                elif (stop - start) / step + 1 > max_points:
+                    axis_errors.append({"field": col, "error": f"more than {max_points} points"})
+                else:
+                    count = int(np.floor((stop - start) / step + 1e-9)) + 1
+                    values = np.round(start + np.arange(count) * step, 6).tolist()
+        if axis_errors or not values:
+            errors.extend(axis_errors or [{"field": col, "error": "no values to sweep"}])
+            continue
+        axes.append((col, values, np.array(values, dtype=np.float64)))
+
+    if not errors:
+        n_points = int(np.prod([len(values) for _, values, _ in axes]))
+        if n_points > max_points:
+            errors.append({"field": "vary", "error": f"grid has {n_points} points (max {max_points})"})
+    return (None, errors) if errors else (axes, errors)
+
+
+def build_grid(row, axes):
+    # Row 0 is the student as given, then every grid point (last axis varying fastest)
+    base = np.asarray(row, dtype=np.float64)
+    shape = [len(encoded) for _, _, encoded in axes]
+    X = np.repeat(base[None, :], 1 + int(np.prod(shape)), axis=0)
+    mesh = np.meshgrid(*[encoded for _, _, encoded in axes], indexing="ij")
+    for (col, _, _), values in zip(axes, mesh):
+        X[1:, FEATURE_COLUMNS.index(col)] = values.ravel()
+    return X
+
+
+def summarize(axes, row, scores, labels):
+    # Turns the scored grid (row 0 = the student as given) into the response body
+    shape = [len(values) for _, values, _ in axes]
+    grid_scores = np.round(scores[1:], 2).reshape(shape)
+    grid_labels = np.asarray(labels[1:]).reshape(shape)
+    base_label = str(labels[0])
+    names = [col for col, _, _ in axes]
+
+    # Label changes between neighbouring values of the last axis, per value of the others
+    boundary = []
+    last_values = axes[-1][1]
+    for fixed in itertools.product(*[range(n) for n in shape[:-1]]):
+        line = grid_labels[fixed]
+        for i in np.flatnonzero(line[1:] != line[:-1]).tolist():
+            point = {names[k]: axes[k][1][j] for k, j in enumerate(fixed)}
+            point[names[-1]] = [last_values[i], last_values[i + 1]]
+            point["Pass_Fail"] = str(line[i + 1])
+            boundary.append(point)
+
+    # Smallest move from the student's own values that flips Pass_Fail: each axis counts
+    # its change as a share of the swept range (numeric) or as 1 (categorical)
+    distance = np.zeros(shape)
+    for k, (col, values, encoded) in enumerate(axes):
+        current = row[FEATURE_COLUMNS.index(col)]
+        if col in CATEGORICAL_COLUMNS:
+            change = (encoded != current).astype(np.float64)
+        else:
+            span = float(encoded.max() - encoded.min()) or 1.0
+            change = np.abs(encoded - current) / span
+        distance += change.reshape([-1 if i == k else 1 for i in range(len(axes))])
+    flipped = grid_labels != base_label
+    minimal_change = None
+    if flipped.any():
+        index = np.unravel_index(np.where(flipped, distance, np.inf).argmin(), shape)
+        minimal_change = {"Final_Exam_Score": float(grid_scores[index]), "Pass_Fail": str(grid_labels[index]),
+                          "changes": {}}
+        for (col, values, encoded), i in zip(axes, index):
+            current = row[FEATURE_COLUMNS.index(col)]
+            if encoded[i] == current:
+                continue
+            if col in CATEGORICAL_COLUMNS:
+                minimal_change["changes"][col] = values[i]
+            else:
+                minimal_change["changes"][col] = {"to": values[i], "by": round(values[i] - current, 6)}
+
+    return {
+        "student": {"Final_Exam_Score": round(float(scores[0]), 2), "Pass_Fail": base_label},
+        "axes": [{"feature": col, "values": values} for col, values, _ in axes],
+        "scores": grid_scores.tolist(),
+        "Pass_Fail": grid_labels.tolist(),
+        "boundary": boundary,
+        "minimal_change": minimal_change,
+    }
@@ -0,0 +1,66 @@
+# tests/conftest.py
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# The modules live at the repository root, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import generate_dataset  # noqa: E402
+from model_bundle import save_bundle  # noqa: E402
+from model_training import train_bundle  # noqa: E402
+from predictor import Predictor  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def bundle(tmp_path_factory):
+    # A small bundle trained on synthetic students, shared by every test
+    csv_path = generate_dataset(2000, str(tmp_path_factory.mktemp("data") / "students.csv"), seed=1)
+    return train_bundle(csv_path, n_estimators=10, n_jobs=1, max_depth=8, permutation_repeats=0)
+
+
+@pytest.fixture(scope="session")
+def predictor(bundle):
+    return Predictor(bundle, backend="flat")
+
+
+@pytest.fixture(scope="session")
+def app_module(bundle, tmp_path_factory):
+    # app.py reads its settings at import, so they are set before the first import
+    model_path = str(tmp_path_factory.mktemp("model") / "student_model.pkl")
+    save_bundle(bundle, model_path)
+    os.environ.update(MODEL_PATH=model_path, PREDICTION_LOG="off", MODEL_WATCH_INTERVAL="0",
+                      FEATURE_CACHE="off", PREDICTION_CACHE="memory")
+    import app
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+@pytest.fixture
+def classes():
+    return {
+        "Gender": ["Female", "Male"],
+        "Parental_Education_Level": ["College", "Graduate", "High School"],
+        "Internet_Access_at_Home": ["No", "Yes"],
+        "Extracurricular_Activities": ["No", "Yes"],
+    }
+
+
+@pytest.fixture
+def student():
+    return {
+        "Gender": "Male", "Study_Hours_per_Week": 12, "Attendance_Rate": 95, "Past_Exam_Scores": 85,
+        "Parental_Education_Level": "College", "Internet_Access_at_Home": "Yes",
+        "Extracurricular_Activities": "Yes",
+    }
@@ -0,0 +1,155 @@
+# tests/test_app.py
+import json
+import time
+
+import numpy as np
+
+import wire_format
+from model_bundle import FEATURE_COLUMNS
+
+
+def post_json_text(client, url, text):
+    # Raw JSON text, for values json.dumps would not produce (huge integers, NaN, Infinity)
+    return client.post(url, data=text, content_type="application/json")
+
+
+def test_predict(client, student):
+    response = client.post("/predict", json=student)
+    assert response.status_code == 200
+    assert set(response.get_json()) == {"Final_Exam_Score", "Pass_Fail"}
+    assert response.headers["X-Model-Version"]
+
+
+def test_predict_reports_invalid_fields(client, student):
+    response = client.post("/predict", json=dict(student, Gender="Robot"))
+    assert response.status_code == 400
+    assert [e["field"] for e in response.get_json()["details"]] == ["Gender"]
+
+
+def test_batch_reports_row_errors(client, student):
+    rows = [student, dict(student, Gender=["Male"]), dict(student, Past_Exam_Scores={"a": 1}), "not a row"]
+    response = client.post("/predict/batch", json=rows)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["count"] == 4 and body["errors"] == 3
+    assert "Final_Exam_Score" in body["results"][0]
+    assert [r["details"][0]["field"] for r in body["results"][1:]] == ["Gender", "Past_Exam_Scores", None]
+
+
+def test_batch_huge_integer_is_a_row_error(client, student):
+    huge = json.dumps(dict(student)).replace('"Attendance_Rate": 95', '"Attendance_Rate": 1' + "0" * 400)
+    response = post_json_text(client, "/predict/batch", f"[{json.dumps(student)}, {huge}]")
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert "Final_Exam_Score" in results[0]
+    assert results[1]["details"] == [{"field": "Attendance_Rate", "error": "must be between 0 and 100"}]
+    single = post_json_text(client, "/predict", huge)
+    assert single.status_code == 400 and single.get_json()["details"] == results[1]["details"]
+
+
+def test_batch_nan_matches_predict(client, student):
+    text = json.dumps(student).replace('"Attendance_Rate": 95', '"Attendance_Rate": NaN')
+    batch = post_json_text(client, "/predict/batch", f"[{text}]").get_json()["results"][0]
+    single = post_json_text(client, "/predict", text).get_json()
+    assert batch["details"] == single["details"] == [{"field": "Attendance_Rate", "error": "must be between 0 and 100"}]
+
+
+def test_batch_ndjson(client, student):
+    body = json.dumps(student) + "\n{broken\n"
+    response = client.post("/predict/batch", data=body, content_type="application/x-ndjson")
+    results = response.get_json()["results"]
+    assert "Final_Exam_Score" in results[0] and "error" in results[1]
+
+
+def test_sweep(client, student):
+    response = client.post("/predict/sweep", json={"student": student, "vary": {"Study_Hours_per_Week": {"min": 0, "max": 10, "step": 5}}})
+    assert response.status_code == 200
+    assert response.get_json()["model_version"]
+
+
+def test_sweep_rejects_non_finite_values(client, student):
+    text = json.dumps({"student": student, "vary": {"Study_Hours_per_Week": {"min": 0, "max": 10, "step": 0}}})
+    for bad in ("Infinity", "NaN", "1" + "0" * 400):
+        response = post_json_text(client, "/predict/sweep", text.replace('"step": 0', '"step": ' + bad))
+        assert response.status_code == 400
+        assert response.get_json()["details"][0]["error"].startswith("step must be a positive finite number")
+    text = json.dumps({"student": student, "vary": {"Attendance_Rate": {"values": [50]}}}).replace("[50]", "[NaN]")
+    response = post_json_text(client, "/predict/sweep", text)
+    assert response.status_code == 400
+    assert response.get_json()["details"] == [{"field": "Attendance_Rate", "error": "must be between 0 and 100"}]
+
+
+def test_reload_requires_token(client, app_module, monkeypatch):
+    started = []
+    monkeypatch.setattr(app_module, "reload_model", lambda train=False: started.append(train))
+    monkeypatch.setattr(app_module, "ADMIN_TOKEN", None)
+    assert client.post("/admin/reload").status_code == 403
+    monkeypatch.setattr(app_module, "ADMIN_TOKEN", "secret")
+    assert client.post("/admin/reload", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.post("/admin/reload", headers={"X-Admin-Token": "secret"}).status_code == 202
+    time.sleep(0.1)
+    assert started == [False]
+
+
+def test_reload_keeps_sklearn_lazy(client, app_module, monkeypatch, student):
+    # Even when the startup load was eager, each worker's reload must not unpickle the forests
+    monkeypatch.setattr(app_module, "LAZY_SKLEARN", False)
+    new_predictor = app_module.reload_model()
+    assert new_predictor is app_module.predictor
+    assert not new_predictor.bundle["sklearn"].loaded
+    assert client.post("/predict", json=student).status_code == 200
+
+
+def pack_rows(rows):
+    records = np.zeros(len(rows), dtype=wire_format.REQUEST_DTYPE)
+    for j, col in enumerate(FEATURE_COLUMNS):
+        records[col] = [row[j] for row in rows]
+    return records.tobytes()
+
+
+def post_binary(client, app_module, url, rows, accept, **kwargs):
+    headers = {"X-Schema-Id": app_module.predictor.schema_id, "Accept": accept}
+    return client.post(url, data=pack_rows(rows), content_type=wire_format.CONTENT_TYPE, headers=headers, **kwargs)
+
+
+def test_binary_batch_negotiates_response(client, app_module, student):
+    row, _ = app_module.predictor.feature_encoder.encode_row(student)
+    invalid = list(row)
+    invalid[FEATURE_COLUMNS.index("Attendance_Rate")] = 500
+    as_json = post_binary(client, app_module, "/predict/batch", [row, invalid], "application/json").get_json()
+    expected = client.post("/predict/batch", json=[student]).get_json()["results"][0]
+    assert as_json["results"][0] == expected
+    assert as_json["results"][1]["details"] == app_module.BINARY_ROW_PROBLEMS
+
+    response = post_binary(client, app_module, "/predict/batch", [row, invalid], wire_format.CONTENT_TYPE)
+    assert response.mimetype == wire_format.CONTENT_TYPE
+    out = np.frombuffer(response.data, dtype=wire_format.RESPONSE_DTYPE)
+    assert out["status"].tolist() == [wire_format.STATUS_OK, wire_format.STATUS_INVALID]
+    assert round(float(out["Final_Exam_Score"][0]), 2) == expected["Final_Exam_Score"]
+
+    response = client.post("/predict/batch", json=[student], headers={"Accept": wire_format.CONTENT_TYPE})
+    assert np.frombuffer(response.data, dtype=wire_format.RESPONSE_DTYPE).tobytes() == out[:1].tobytes()
+
+
+def test_binary_single_row(client, app_module, student):
+    row, _ = app_module.predictor.feature_encoder.encode_row(student)
+    invalid = list(row)
+    invalid[FEATURE_COLUMNS.index("Gender")] = 9
+    response = post_binary(client, app_module, "/predict", [invalid], wire_format.CONTENT_TYPE)
+    assert response.status_code == 200
+    assert np.frombuffer(response.data, dtype=wire_format.RESPONSE_DTYPE)["status"].tolist() == [wire_format.STATUS_INVALID]
+    response = post_binary(client, app_module, "/predict", [invalid], "application/json")
+    assert response.status_code == 400 and response.get_json()["details"] == app_module.BINARY_ROW_PROBLEMS
+    response = post_binary(client, app_module, "/predict", [row], "application/json")
+    assert response.get_json() == client.post("/predict", json=student).get_json()
+
+
+def test_binary_request_checks_schema_and_options(client, app_module, student):
+    row, _ = app_module.predictor.feature_encoder.encode_row(student)
+    response = client.post("/predict", data=pack_rows([row]), content_type=wire_format.CONTENT_TYPE,
+                           headers={"X-Schema-Id": "stale"})
+    assert response.status_code == 409
+    assert response.get_json()["schema_id"] == app_module.predictor.schema_id
+    response = post_binary(client, app_module, "/predict/batch", [row], wire_format.CONTENT_TYPE,
+                           query_string={"uncertainty": "1"})
+    assert response.status_code == 406
@@ -0,0 +1,58 @@
+# tests/test_feature_store.py
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+from benchmark import generate_dataset
+from feature_store import FeatureStore, read_training_csv
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    return generate_dataset(200, str(tmp_path / "students.csv"), seed=2)
+
+
+def entries(store):
+    return sorted(name for name in os.listdir(store.cache_dir) if len(name) == 64)
+
+
+def test_load_matches_csv(tmp_path, csv_path):
+    store = FeatureStore(str(tmp_path / "cache"))
+    expected = read_training_csv(csv_path, 50)
+    pd.testing.assert_frame_equal(store.load(csv_path, 50), expected)
+    # Second load comes from the cache
+    pd.testing.assert_frame_equal(store.load(csv_path, 50), expected)
+    assert entries(store) == [store.checksum(csv_path)]
+
+
+def test_changed_file_replaces_only_its_entry(tmp_path, csv_path):
+    store = FeatureStore(str(tmp_path / "cache"))
+    other = generate_dataset(100, str(tmp_path / "other.csv"), seed=3)
+    store.load(csv_path, 50)
+    store.load(other, 50)
+    # An entry no manifest path refers to, e.g. one another process is still ingesting
+    stray = os.path.join(store.cache_dir, "f" * 64)
+    os.makedirs(stray)
+    old = store.checksum(csv_path)
+
+    generate_dataset(150, csv_path, seed=4)
+    store.load(csv_path, 50)
+    assert old not in entries(store)
+    assert store.checksum(other) in entries(store) and os.path.isdir(stray)
+
+
+def test_concurrent_checksums_keep_every_path(tmp_path):
+    store = FeatureStore(str(tmp_path / "cache"))
+    paths = [str(tmp_path / f"{i}.csv") for i in range(8)]
+    for i, path in enumerate(paths):
+        with open(path, "w") as f:
+            f.write(f"row {i}\n")
+    threads = [threading.Thread(target=FeatureStore(store.cache_dir).checksum, args=(path,)) for path in paths]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert set(store._read_manifest()) == {os.path.abspath(path) for path in paths}
+    assert not [name for name in os.listdir(store.cache_dir) if name.endswith(".tmp")]
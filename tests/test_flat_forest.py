@@ -0,0 +1,82 @@
+# tests/test_flat_forest.py
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
+from flat_forest import FlatForest, ForestGroup
+
+
+def fitted(model_class, rng, n_rows=500):
+    X = rng.normal(size=(n_rows, 4)).astype(np.float32)
+    y = X[:, 0] * 3 + X[:, 1] ** 2 + rng.normal(scale=0.1, size=n_rows)
+    if model_class is RandomForestClassifier:
+        y = np.digitize(y, np.quantile(y, [0.3, 0.7]))
+    model = model_class(n_estimators=8, max_depth=6, random_state=0).fit(X, y)
+    return model, X.astype(np.float64)
+
+
+@pytest.mark.parametrize("precision", ["float64", None])
+def test_regression_matches_sklearn(rng, precision):
+    model, X = fitted(RandomForestRegressor, rng)
+    forest = FlatForest.from_sklearn(model)
+    if precision:
+        forest = forest.compact(precision)
+    np.testing.assert_array_equal(forest.predict_regression(X), model.predict(X))
+
+
+def test_classifier_matches_sklearn(rng):
+    model, X = fitted(RandomForestClassifier, rng)
+    forest = FlatForest.from_sklearn(model).compact()
+    np.testing.assert_allclose(forest.predict_proba(X), model.predict_proba(X), rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(forest.classes, model.classes_)
+
+
+def test_float32_thresholds_route_like_sklearn(rng):
+    # Inputs exactly on, just above and just below every float32 threshold: compact()
+    # rounds thresholds down to float32, which must send them the same way as sklearn
+    model, X = fitted(RandomForestRegressor, rng)
+    forest = FlatForest.from_sklearn(model)
+    internal = forest.left != np.arange(forest.n_nodes)
+    features, thresholds = forest.feature[internal], forest.threshold[internal]
+    edges = np.repeat(X[:1], len(thresholds) * 3, axis=0)
+    for k, (feature, threshold) in enumerate(zip(features, thresholds.astype(np.float32))):
+        for i, value in enumerate((np.nextafter(threshold, np.float32(-np.inf)), threshold,
+                                   np.nextafter(threshold, np.float32(np.inf)))):
+            edges[3 * k + i, feature] = value
+    np.testing.assert_array_equal(forest.compact().predict_regression(edges), model.predict(edges))
+
+
+def test_predictor_backends_agree(predictor, rng):
+    X = np.column_stack([rng.integers(0, 2, 200), rng.integers(0, 41, 200), rng.integers(40, 101, 200),
+                         rng.integers(30, 101, 200), rng.integers(0, 3, 200), rng.integers(0, 2, 200),
+                         rng.integers(0, 2, 200)]).astype(np.float64)
+    flat_scores, flat_passfail = predictor.predict_matrix(X, "flat")
+    sklearn_scores, sklearn_passfail = predictor.predict_matrix(X, "sklearn")
+    np.testing.assert_array_equal(flat_scores, sklearn_scores)
+    np.testing.assert_array_equal(flat_passfail, sklearn_passfail)
+
+
+def test_forest_group_matches_each_forest(rng):
+    regressor, X = fitted(RandomForestRegressor, rng)
+    classifier, _ = fitted(RandomForestClassifier, rng)
+    forests = [FlatForest.from_sklearn(regressor).compact(), FlatForest.from_sklearn(classifier).compact()]
+    score_leaves, class_leaves = ForestGroup(forests).leaf_values(X)
+    np.testing.assert_allclose(forests[0].mean_of(score_leaves)[:, 0], forests[0].predict_regression(X))
+    np.testing.assert_allclose(forests[1].mean_of(class_leaves), forests[1].predict_proba(X))
+
+
+@pytest.mark.parametrize("precision", ["float64", "float32", "uint16"])
+def test_contributions_sum_to_prediction(rng, precision):
+    model, X = fitted(RandomForestRegressor, rng)
+    forest = FlatForest.from_sklearn(model).compact(precision)
+    bias, contributions = forest.contributions(X[:50])
+    np.testing.assert_allclose(bias[0] + contributions[:, :, 0].sum(axis=1), forest.predict_regression(X[:50]),
+                               atol=1e-9)
+
+
+def test_classifier_contributions_sum_to_probability(rng):
+    model, X = fitted(RandomForestClassifier, rng)
+    forest = FlatForest.from_sklearn(model).compact()
+    bias, contributions = forest.contributions(X[:50], [2])
+    np.testing.assert_allclose(bias[0] + contributions[:, :, 0].sum(axis=1), forest.predict_proba(X[:50])[:, 2],
+                               atol=1e-9)
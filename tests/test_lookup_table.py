@@ -0,0 +1,44 @@
+# tests/test_lookup_table.py
+import numpy as np
+import pytest
+
+from lookup_table import DEFAULT_GRID, LookupTable, parse_grid
+from predictor import Predictor
+
+GRID = {"Study_Hours_per_Week": (0, 20, 5), "Attendance_Rate": (80, 100, 10), "Past_Exam_Scores": (70, 90, 10)}
+
+
+@pytest.fixture(scope="module")
+def table_predictor(bundle):
+    models = bundle["sklearn"].get()
+    table = LookupTable.build(models["score_model"], models["passfail_model"], models["encoders"], GRID)
+    return Predictor(dict(bundle, lookup_table=table), backend="table")
+
+
+def test_parse_grid():
+    grid = parse_grid("Attendance_Rate=50:100:5")
+    assert grid["Attendance_Rate"] == (50.0, 100.0, 5.0)
+    assert grid["Study_Hours_per_Week"] == DEFAULT_GRID["Study_Hours_per_Week"]
+    with pytest.raises(ValueError):
+        parse_grid("Gender=0:1:1")
+
+
+def test_table_matches_sklearn_on_the_grid(table_predictor):
+    table = table_predictor.lookup_table
+    assert table.scores.shape == (2, 5, 3, 3, 3, 2, 2)
+    X = np.array([[1, 15, 90, 80, 2, 1, 0], [0, 0, 100, 70, 0, 0, 1]], dtype=np.float64)
+    scores, passfail_idx, on_grid = table.lookup(X)
+    assert on_grid.all()
+    expected_scores, expected_passfail = table_predictor.predict_matrix(X, "sklearn")
+    np.testing.assert_allclose(scores, expected_scores, atol=table.max_deviation + 1e-4)
+    np.testing.assert_array_equal(passfail_idx, expected_passfail)
+
+
+def test_off_grid_rows_fall_back(table_predictor):
+    X = np.array([[1, 15, 90, 80, 2, 1, 0], [1, 12.5, 90, 80, 2, 1, 0], [1, 15, 95, 80, 2, 1, 0]], dtype=np.float64)
+    _, _, on_grid = table_predictor.lookup_table.lookup(X)
+    assert on_grid.tolist() == [True, False, False]
+    scores, passfail_idx = table_predictor.predict_matrix(X)
+    expected_scores, expected_passfail = table_predictor.predict_matrix(X[1:], "flat")
+    np.testing.assert_allclose(scores[1:], expected_scores)
+    np.testing.assert_array_equal(passfail_idx[1:], expected_passfail)
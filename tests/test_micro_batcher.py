@@ -0,0 +1,55 @@
+# tests/test_micro_batcher.py
+import threading
+
+import numpy as np
+import pytest
+
+from micro_batcher import MicroBatcher
+
+
+class CountingModel:
+    # Scores each row as its first feature and records the size of every call
+    def __init__(self):
+        self.calls = []
+
+    def predict_matrix(self, X, backend=None):
+        if backend == "broken":
+            raise ValueError("Unknown inference backend: broken")
+        self.calls.append(len(X))
+        return X[:, 0].copy(), np.zeros(len(X), dtype=np.int64)
+
+
+def test_concurrent_requests_share_one_call():
+    model, batcher = CountingModel(), MicroBatcher(max_wait_ms=200, max_rows=8)
+    results = {}
+    barrier = threading.Barrier(8)
+
+    def request(i):
+        barrier.wait()
+        results[i] = batcher.predict_matrix(model, np.array([[float(i)], [i + 0.5]]))[0].tolist()
+
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Every caller gets its own rows back, in order
+    assert results == {i: [float(i), i + 0.5] for i in range(8)}
+    assert sum(model.calls) == 16 and len(model.calls) < 8
+
+
+def test_matches_direct_prediction(predictor, student):
+    row, _ = predictor.feature_encoder.encode_row(student)
+    X = np.array([row])
+    scores, passfail_idx = MicroBatcher(max_wait_ms=1).predict_matrix(predictor, X)
+    expected_scores, expected_passfail = predictor.predict_matrix(X)
+    np.testing.assert_array_equal(scores, expected_scores)
+    np.testing.assert_array_equal(passfail_idx, expected_passfail)
+
+
+def test_errors_reach_the_caller():
+    batcher = MicroBatcher(max_wait_ms=1)
+    with pytest.raises(ValueError, match="broken"):
+        batcher.predict_matrix(CountingModel(), np.zeros((1, 1)), "broken")
+    # The batcher keeps serving afterwards
+    assert batcher.predict_matrix(CountingModel(), np.ones((1, 1)))[0].tolist() == [1.0]
@@ -0,0 +1,57 @@
+# tests/test_prediction_cache.py
+import pytest
+
+from prediction_cache import DiskCache, LRUCache, make_cache
+
+KEY = ("v1", 1.0, 12.0, 95.0, 85.0, 0.0, 1.0, 1.0)
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_expires_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("prediction_cache.time.monotonic", lambda: now[0])
+    cache = LRUCache(ttl=10)
+    cache.put("a", 1)
+    now[0] += 11
+    assert cache.get("a") is None and cache.stats()["expirations"] == 1
+
+
+def test_disk_cache_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    DiskCache(path).put(KEY, (71.25, "Pass"))
+    other = DiskCache(path)
+    assert other.get(KEY) == (71.25, "Pass")
+    assert other.get(KEY[:-1] + (0.0,)) is None
+    assert other.stats()["hits"] == 1 and other.stats()["misses"] == 1
+
+
+def test_disk_cache_evicts_in_batches(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.sqlite"), maxsize=10, evict_every=5)
+    for i in range(30):
+        cache.put(("v1", float(i)), (float(i), "Pass"))
+    assert cache.stats()["size"] <= 10 + 5
+    # The newest entry always survives
+    assert cache.get(("v1", 29.0)) == (29.0, "Pass")
+
+
+def test_disk_cache_errors_are_misses(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.sqlite"))
+    cache._connect().execute("DROP TABLE cache")
+    cache.put(KEY, (1.0, "Pass"))
+    assert cache.get(KEY) is None and cache.stats()["errors"] >= 2
+
+
+def test_make_cache():
+    assert make_cache("off", 10) is None
+    assert isinstance(make_cache("memory", 10), LRUCache)
+    with pytest.raises(ValueError):
+        make_cache("redis", 10)
@@ -0,0 +1,57 @@
+# tests/test_prediction_log.py
+import glob
+import gzip
+import json
+import os
+import subprocess
+import sys
+
+from prediction_log import PredictionLog
+
+
+def read_rotated(tmp_path):
+    lines = []
+    for path in sorted(glob.glob(str(tmp_path / "predictions-*.jsonl.gz"))):
+        with gzip.open(path, "rt") as f:
+            lines += [json.loads(line) for line in f]
+    return lines
+
+
+def test_close_writes_and_rotates(tmp_path):
+    log = PredictionLog(str(tmp_path / "predictions.jsonl"), flush_interval=0.01)
+    log.log({"i": 0})
+    log.log_many(({"i": i} for i in range(1, 4)), 3)
+    log.close()
+    assert not os.path.exists(log.current_path)
+    assert read_rotated(tmp_path) == [{"i": i} for i in range(4)]
+    assert log.stats()["written"] == 4
+
+
+def test_rotates_by_size(tmp_path):
+    log = PredictionLog(str(tmp_path / "predictions.jsonl"), max_bytes=1, flush_interval=0.01)
+    for i in range(3):
+        log.log({"i": i})
+    log.close()
+    assert sorted(r["i"] for r in read_rotated(tmp_path)) == [0, 1, 2]
+
+
+def test_queue_drops_rows_past_the_limit(tmp_path):
+    log = PredictionLog(str(tmp_path / "predictions.jsonl"), queue_size=5, flush_interval=0.01)
+    log.log_many(({"i": i} for i in range(6)), 6)
+    log.close()
+    assert log.dropped == 6 and log.written == 0
+
+
+def test_rotates_files_of_dead_processes(tmp_path):
+    # A pid that has exited: the child's own pid, read after it is reaped
+    pid = int(subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                             capture_output=True, text=True, check=True).stdout)
+    stale = tmp_path / f"predictions-{pid}.jsonl"
+    stale.write_text('{"i": "stale"}\n')
+    live = tmp_path / f"predictions-{os.getppid()}.jsonl"
+    live.write_text('{"i": "live"}\n')
+    log = PredictionLog(str(tmp_path / "predictions.jsonl"), flush_interval=0.01)
+    log.log({"i": 0})
+    log.close()
+    assert not stale.exists() and live.exists()
+    assert sorted(r["i"] for r in read_rotated(tmp_path) if isinstance(r["i"], str)) == ["stale"]
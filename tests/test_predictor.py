@@ -0,0 +1,113 @@
+# tests/test_predictor.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from model_bundle import FEATURE_COLUMNS
+from predictor import FeatureEncoder
+
+# (field, value) pairs that /predict rejects, each with the start of its error message
+INVALID = [
+    ("Gender", "Robot", "unknown value"),
+    ("Gender", ["Male"], "unknown value"),
+    ("Gender", {"label": "Male"}, "unknown value"),
+    ("Gender", 1, "unknown value"),
+    ("Study_Hours_per_Week", True, "expected a number"),
+    ("Study_Hours_per_Week", "many", "expected a number"),
+    ("Study_Hours_per_Week", [12], "expected a number"),
+    ("Attendance_Rate", 101, "must be between"),
+    ("Attendance_Rate", "nan", "must be between"),
+    ("Attendance_Rate", float("nan"), "must be between"),
+    ("Attendance_Rate", 10 ** 400, "must be between"),
+    ("Past_Exam_Scores", -1, "must be between"),
+]
+
+
+def test_encode_row_valid(classes, student):
+    row, errors = FeatureEncoder(classes).encode_row(student)
+    assert errors == []
+    assert row == [1.0, 12.0, 95.0, 85.0, 0.0, 1.0, 1.0]
+
+
+def test_encode_row_normalizes_labels(classes, student):
+    loose = dict(student, Gender=" male ", Internet_Access_at_Home="YES")
+    assert FeatureEncoder(classes).encode_row(loose) == FeatureEncoder(classes).encode_row(student)
+    row, errors = FeatureEncoder(classes, normalize=False).encode_row(loose)
+    assert row is None and [e["field"] for e in errors] == ["Gender", "Internet_Access_at_Home"]
+
+
+def test_encode_row_accepts_numeric_strings(classes, student):
+    row, errors = FeatureEncoder(classes).encode_row(dict(student, Attendance_Rate="95"))
+    assert errors == [] and row[2] == 95.0
+
+
+@pytest.mark.parametrize("field, value, message", INVALID)
+def test_encode_row_rejects(classes, student, field, value, message):
+    row, errors = FeatureEncoder(classes).encode_row(dict(student, **{field: value}))
+    assert row is None
+    assert [e["field"] for e in errors] == [field]
+    assert errors[0]["error"].startswith(message)
+
+
+def test_encode_row_reports_every_problem(classes, student):
+    data = dict(student, Gender="Robot", Attendance_Rate=500)
+    del data["Past_Exam_Scores"]
+    _, errors = FeatureEncoder(classes).encode_row(data)
+    assert {e["field"]: e["error"] for e in errors}.keys() == {"Gender", "Attendance_Rate", "Past_Exam_Scores"}
+    assert FeatureEncoder(classes).encode_row([student])[1] == [{"field": None, "error": "Expected a JSON object"}]
+
+
+def test_encode_frame_matches_encode_row(predictor, student):
+    # Every row of a batch gets exactly the result /predict would give it
+    rows = [student, dict(student, Gender=" FEMALE "), dict(student, Attendance_Rate="88.5"), {"Gender": "Male"}]
+    rows += [dict(student, **{field: value}) for field, value, _ in INVALID]
+    frame = pd.DataFrame(rows, columns=FEATURE_COLUMNS, dtype=object)
+    X, problems = predictor.encode_frame(frame, rows)
+    for i, data in enumerate(rows):
+        row, errors = predictor.feature_encoder.encode_row(data)
+        assert problems[i] == errors, data
+        if row is not None:
+            np.testing.assert_array_equal(X[i], row)
+
+
+def test_encode_frame_survives_huge_integers(predictor, student):
+    # Without the original rows the huge value is re-checked from the frame itself
+    rows = [student, dict(student, Attendance_Rate=10 ** 400)]
+    _, problems = predictor.encode_frame(pd.DataFrame(rows, columns=FEATURE_COLUMNS, dtype=object))
+    assert problems == [[], [{"field": "Attendance_Rate", "error": "must be between 0 and 100"}]]
+
+
+def test_encode_frame_missing_column(predictor, student):
+    frame = pd.DataFrame([student]).drop(columns=["Gender"])
+    _, problems = predictor.encode_frame(frame)
+    assert problems == [[{"field": "Gender", "error": "missing"}]]
+
+
+def test_score_frame_flags_invalid_rows(predictor, student):
+    frame = pd.DataFrame([student, dict(student, Attendance_Rate=500)])
+    scored = predictor.score_frame(frame)
+    assert scored["error"].isna().tolist() == [True, False]
+    assert scored["error"][1] == "Attendance_Rate: must be between 0 and 100"
+    assert scored["Pass_Fail"][0] in predictor.classes["Pass_Fail"]
+
+
+@pytest.mark.parametrize("backend", ["flat", "sklearn"])
+def test_uncertainty_matches_prediction(predictor, student, backend):
+    row, _ = predictor.feature_encoder.encode_row(student)
+    X = np.array([row, row])
+    scores, passfail_idx, details = predictor.predict_uncertainty(X, 0.9, backend)
+    expected_scores, expected_passfail = predictor.predict_matrix(X, backend)
+    np.testing.assert_allclose(scores, expected_scores)
+    np.testing.assert_array_equal(passfail_idx, expected_passfail)
+    assert (details["score_low"] <= scores).all() and (scores <= details["score_high"]).all()
+    np.testing.assert_allclose(details["proba"].sum(axis=1), 1.0)
+
+
+def test_explanation_sums_to_prediction(predictor, student):
+    row, _ = predictor.feature_encoder.encode_row(student)
+    X = np.array([row])
+    explanation = predictor.explain(X)
+    score, _ = predictor.predict_matrix(X, "flat")
+    assert explanation["score_bias"] + explanation["score"].sum() == pytest.approx(score[0])
+    for name, values in (("score", explanation["score"]), ("pass", explanation["pass"])):
+        assert values.shape == (1, len(FEATURE_COLUMNS)), name
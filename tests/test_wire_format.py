@@ -0,0 +1,60 @@
+# tests/test_wire_format.py
+import numpy as np
+import pytest
+
+import wire_format
+from model_bundle import FEATURE_COLUMNS
+from predictor import NUMERIC_RANGES
+
+
+def pack(rows):
+    records = np.zeros(len(rows), dtype=wire_format.REQUEST_DTYPE)
+    for j, col in enumerate(FEATURE_COLUMNS):
+        records[col] = [row[j] for row in rows]
+    return records.tobytes()
+
+
+ROWS = [[1, 12, 95, 85, 0, 1, 1], [0, 0.5, 100, 0, 2, 0, 0]]
+
+
+def test_decode_rows_round_trip(classes):
+    X, valid = wire_format.decode_rows(pack(ROWS), classes, NUMERIC_RANGES)
+    np.testing.assert_array_equal(X, ROWS)
+    assert valid.tolist() == [True, True]
+
+
+def test_decode_row_matches_decode_rows(classes):
+    body = pack(ROWS[:1])
+    row, valid = wire_format.decode_row(body, classes, NUMERIC_RANGES)
+    assert valid and row == wire_format.decode_rows(body, classes, NUMERIC_RANGES)[0][0].tolist()
+
+
+def test_decode_flags_invalid_rows(classes):
+    rows = ROWS + [[2, 12, 95, 85, 0, 1, 1], [1, 12, 101, 85, 0, 1, 1], [1, 12, 95, 85, 3, 1, 1]]
+    _, valid = wire_format.decode_rows(pack(rows), classes, NUMERIC_RANGES)
+    assert valid.tolist() == [True, True, False, False, False]
+    assert [wire_format.decode_row(pack([row]), classes, NUMERIC_RANGES)[1] for row in rows] == valid.tolist()
+
+
+def test_decode_rejects_partial_records(classes):
+    with pytest.raises(ValueError):
+        wire_format.decode_rows(pack(ROWS)[:-1], classes, NUMERIC_RANGES)
+    with pytest.raises(ValueError):
+        wire_format.decode_row(pack(ROWS), classes, NUMERIC_RANGES)
+
+
+def test_encode_results_round_trip():
+    valid = np.array([True, False, True])
+    body = wire_format.encode_results(np.array([71.25, 48.5]), np.array([1, 0]), valid)
+    out = np.frombuffer(body, dtype=wire_format.RESPONSE_DTYPE)
+    assert out["Final_Exam_Score"].tolist() == [71.25, 0.0, 48.5]
+    assert out["Pass_Fail"].tolist() == [1, 0, 0]
+    assert out["status"].tolist() == [wire_format.STATUS_OK, wire_format.STATUS_INVALID, wire_format.STATUS_OK]
+    single = np.frombuffer(wire_format.encode_result(71.25, 1), dtype=wire_format.RESPONSE_DTYPE)
+    assert single.tobytes() == out[:1].tobytes()
+
+
+def test_schema_id_changes_with_classes(classes):
+    changed = dict(classes, Gender=["Female", "Male", "Other"])
+    assert wire_format.schema_id(classes) == wire_format.schema_id(dict(classes))
+    assert wire_format.schema_id(changed) != wire_format.schema_id(classes)
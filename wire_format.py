@@ -0,0 +1,93 @@
+# wire_format.py
+# Fixed-layout binary rows for high-volume clients, as an alternative to JSON on the
+# prediction endpoints. A request body is N packed little-endian records of REQUEST_DTYPE
+# (16 bytes each); categoricals are sent as their index in the model's label classes, which
+# GET /predict/schema publishes together with a schema id the client echoes back in
+# X-Schema-Id. Parsing is a single np.frombuffer, with no per-field Python work.
+import hashlib
+import json
+import struct
+
+import numpy as np
+
+from model_bundle import FEATURE_COLUMNS, CATEGORICAL_COLUMNS
+
+CONTENT_TYPE = "application/vnd.edupredict.rows"
+
+REQUEST_DTYPE = np.dtype([(col, "u1" if col in CATEGORICAL_COLUMNS else "<f4") for col in FEATURE_COLUMNS])
+# The same layouts as struct formats, for single rows where NumPy's per-call overhead dominates
+REQUEST_STRUCT = struct.Struct("<" + "".join("B" if col in CATEGORICAL_COLUMNS else "f" for col in FEATURE_COLUMNS))
+# status: 0 = scored, 1 = invalid input (score and Pass_Fail are then meaningless)
+RESPONSE_DTYPE = np.dtype([("Final_Exam_Score", "<f4"), ("Pass_Fail", "u1"), ("status", "u1")])
+
+RESPONSE_STRUCT = struct.Struct("<fBB")
+
+STATUS_OK = 0
+STATUS_INVALID = 1
+
+
+def schema_id(classes):
+    # Changes whenever a retrained model orders its labels differently, so clients holding
+    # stale category indices are refused instead of silently scored with the wrong labels
+    canonical = json.dumps(classes, sort_keys=True).encode()
+    return hashlib.sha256(canonical).hexdigest()[:12]
+
+
+def describe(classes):
+    return {
+        "content_type": CONTENT_TYPE,
+        "schema_id": schema_id(classes),
+        "request": [{"field": name, "type": REQUEST_DTYPE[name].str} for name in REQUEST_DTYPE.names],
+        "response": [{"field": name, "type": RESPONSE_DTYPE[name].str} for name in RESPONSE_DTYPE.names],
+        "classes": classes,
+    }
+
+
+def decode_rows(body, classes, ranges):
+    # Returns (float64 feature matrix, valid mask). Raises ValueError if the body is not
+    # a whole number of records.
+    if len(body) % REQUEST_DTYPE.itemsize:
+        raise ValueError(f"Body is {len(body)} bytes, not a multiple of {REQUEST_DTYPE.itemsize}")
+    records = np.frombuffer(body, dtype=REQUEST_DTYPE)
+    X = np.empty((len(records), len(FEATURE_COLUMNS)), dtype=np.float64)
+    valid = np.ones(len(records), dtype=bool)
+    for j, col in enumerate(FEATURE_COLUMNS):
+        values = records[col]
+        if col in CATEGORICAL_COLUMNS:
+            valid &= values < len(classes[col])
+        else:
+            low, high = ranges[col]
+            valid &= (values >= low) & (values <= high)
+        X[:, j] = values
+    return X, valid
+
+
+def decode_row(body, classes, ranges):
+    # Single-record fast path: returns (feature row as floats, valid)
+    if len(body) != REQUEST_STRUCT.size:
+        raise ValueError(f"Expected one {REQUEST_STRUCT.size}-byte record, got {len(body)} bytes; "
+                         "use /predict/batch for several")
+    row = [float(value) for value in REQUEST_STRUCT.unpack(body)]
+    for col, value in zip(FEATURE_COLUMNS, row):
+        if col in CATEGORICAL_COLUMNS:
+            if value >= len(classes[col]):
+                return row, False
+        else:
+            low, high = ranges[col]
+            if not low <= value <= high:
+                return row, False
+    return row, True
+
+
+def encode_result(score, passfail_idx):
+    return RESPONSE_STRUCT.pack(score, passfail_idx, STATUS_OK)
+
+
+def encode_results(scores, passfail_idx, valid):
+    # scores and passfail_idx cover the valid rows only; invalid rows are zero-filled
+    valid = np.asarray(valid, dtype=bool)
+    out = np.zeros(len(valid), dtype=RESPONSE_DTYPE)
+    out["Final_Exam_Score"][valid] = scores
+    out["Pass_Fail"][valid] = passfail_idx
+    out["status"][~valid] = STATUS_INVALID
+    return out.tobytes()